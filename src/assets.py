@@ -0,0 +1,88 @@
+import json
+import os
+import re
+
+from buildplan import scan_files # type: ignore
+from copystatic import copy_file # type: ignore
+from manifest import hash_file # type: ignore
+
+
+asset_manifest_name = "asset-manifest.json"
+hash_length = 12
+# matches the names hashed_name produces, which never change content
+fingerprint_re = re.compile(r"\.[0-9a-f]{12}(\.[^./]*)?$")
+
+
+def hashed_name(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:hash_length]}{ext}"
+
+
+def fingerprint_static(source_dir_path, dest_dir_path, previous, link=False, files=None):
+    # copies every static file to its content-hashed name. previous maps each
+    # "/"-separated relative path to [size, mtime_ns, hashed path] from the
+    # last build; files with the same size and mtime are not hashed again.
+    # files, if given, are the relative paths an earlier walk found.
+    # Returns the new state and the relative paths whose hashed name changed
+    # or that were removed. With no dest_dir_path nothing is copied.
+    state = {}
+    changed = []
+    for rel_path in scan_files(source_dir_path) if files is None else files:
+        from_path = os.path.join(source_dir_path, rel_path)
+        stat = os.stat(from_path)
+        old = previous.get(rel_path)
+        if old is not None and old[:2] == [stat.st_size, stat.st_mtime_ns]:
+            hashed = old[2]
+        else:
+            hashed = hashed_name(rel_path, hash_file(from_path))
+        state[rel_path] = [stat.st_size, stat.st_mtime_ns, hashed]
+        if old is None or old[2] != hashed:
+            changed.append(rel_path)
+        if dest_dir_path is None:
+            continue
+        dest_path = os.path.join(dest_dir_path, hashed)
+        # the name is the content, so a complete copy is always current
+        if not is_complete(dest_path, stat.st_size):
+            print(f" * {from_path} -> {dest_path}")
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            copy_atomic(from_path, dest_path, link)
+
+    for rel_path, old in previous.items():
+        if rel_path not in state:
+            changed.append(rel_path)
+        elif state[rel_path][2] == old[2]:
+            continue
+        if dest_dir_path is not None:
+            dest_path = os.path.join(dest_dir_path, old[2])
+            if os.path.exists(dest_path):
+                print(f" - removing {dest_path}")
+                os.remove(dest_path)
+    return state, changed
+
+
+def is_complete(dest_path, size):
+    try:
+        return os.stat(dest_path).st_size == size
+    except FileNotFoundError:
+        return False
+
+
+def copy_atomic(from_path, dest_path, link=False):
+    # a hashed name is cached forever, so it must never hold a partial copy
+    # left by an interrupted build: copy beside it, then rename into place
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        copy_file(from_path, tmp_path, link)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def asset_paths(state):
+    return {rel_path: entry[2] for rel_path, entry in state.items()}
+
+
+def write_asset_manifest(dest_dir_path, paths):
+    with open(os.path.join(dest_dir_path, asset_manifest_name), "w") as f:
+        json.dump(paths, f, indent=1, sort_keys=True)
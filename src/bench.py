@@ -0,0 +1,462 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import fileio # type: ignore
+from blocks import scan_blocks, lines_to_blocktype, block_to_html_node, make_block, BlockType # type: ignore
+from gencontent import find_pages, generate_pages # type: ignore
+from htmlnode import ParentNode # type: ignore
+from inline import text_to_textnodes # type: ignore
+from lazyserver import LazySite, start_lazy_server # type: ignore
+from template import Template # type: ignore
+
+
+# python3 src/bench.py [--suite pipeline] [--scale 1.0] [--corpus small,huge]
+#                      [--output bench_output.json] [--compare previous.json] [--threshold 0.10]
+#
+# Builds synthetic corpora, times every stage of the pipeline separately and
+# writes the timings as JSON. With --compare, stages that got slower than the
+# threshold are listed and the exit status is 1, so it can gate a change.
+#
+# Other suites are microbenchmarks of a single component:
+#   classify  block classification over a list-heavy corpus, against the
+#             old classify-every-line-then-compare implementation
+#   io        read and copy throughput of the buffered and mmap io backends
+#             over the huge corpus plus a tree of large binary assets
+#   serve     request latency of the lazy server, first (cold, rendered)
+#             and second (warm, cached) request for every page
+
+template_text = """<!DOCTYPE html>
+<html>
+<head>
+    <title> {{ Title }} </title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+</html>"""
+
+
+def paragraph(rng, links=1):
+    words = ["tolkien", "ring", "**bold words**", "_italic_", "`code()`", "hobbit", "elf", "the", "and"]
+    parts = [rng.choice(words) for _ in range(30)]
+    for i in range(links):
+        parts.insert(rng.randrange(len(parts)), f"[link {i}](/blog/page-{rng.randrange(1000)})")
+    return " ".join(parts)
+
+
+def ulist(rng, items):
+    return "\n".join(f"- item {i} with _some_ `text` and [a link](/x/{i})" for i in range(items))
+
+
+def olist(rng, items):
+    return "\n".join(f"{i + 1}. step {i} **do** the thing" for i in range(items))
+
+
+def code(rng, lines):
+    body = "\n".join(f"    value_{i} = compute(**kwargs) * _scale_  # [not](a link)" for i in range(lines))
+    return f"```\n{body}\n```"
+
+
+def page(rng, title, blocks):
+    return f"# {title}\n\n" + "\n\n".join(blocks) + "\n"
+
+
+def corpus_small(rng, scale):
+    pages = []
+    for i in range(int(2000 * scale)):
+        blocks = [paragraph(rng), ulist(rng, 3), paragraph(rng), "> a quote\n> more quote"]
+        pages.append((f"small/page-{i}.md", page(rng, f"Small {i}", blocks)))
+    return pages
+
+
+def corpus_huge(rng, scale):
+    pages = []
+    for i in range(3):
+        blocks = []
+        for j in range(int(3000 * scale)):
+            blocks.append(f"## Section {j}")
+            blocks.append(paragraph(rng, 2))
+            blocks.append(ulist(rng, 4) if j % 2 else olist(rng, 4))
+        pages.append((f"huge/page-{i}.md", page(rng, f"Huge {i}", blocks)))
+    return pages
+
+
+def corpus_links(rng, scale):
+    pages = []
+    for i in range(int(200 * scale)):
+        blocks = [paragraph(rng, 40) for _ in range(20)]
+        pages.append((f"links/page-{i}.md", page(rng, f"Links {i}", blocks)))
+    return pages
+
+
+def corpus_lists(rng, scale):
+    pages = []
+    for i in range(int(200 * scale)):
+        blocks = [ulist(rng, 50) if j % 2 else olist(rng, 50) for j in range(10)]
+        pages.append((f"lists/page-{i}.md", page(rng, f"Lists {i}", blocks)))
+    return pages
+
+
+def corpus_code(rng, scale):
+    pages = []
+    for i in range(int(200 * scale)):
+        blocks = [code(rng, 60) if j % 2 else paragraph(rng) for j in range(10)]
+        pages.append((f"code/page-{i}.md", page(rng, f"Code {i}", blocks)))
+    return pages
+
+
+corpora = {
+    "small": corpus_small,
+    "huge": corpus_huge,
+    "links": corpus_links,
+    "lists": corpus_lists,
+    "code": corpus_code,
+}
+
+
+class Timer:
+    def __init__(self):
+        self.totals = {}
+
+    def time(self, stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - start
+        return result
+
+
+def inline_text(block, block_type):
+    # the text handed to text_to_textnodes for each block type
+    lines = block.lines
+    if block_type == BlockType.code:
+        return []
+    if block_type == BlockType.heading:
+        return [block.text.lstrip("#")[1:]]
+    if block_type == BlockType.unordered_list:
+        return [line[2:] for line in lines]
+    if block_type == BlockType.ordered_list:
+        return [line.split(". ", 1)[1] for line in lines]
+    if block_type == BlockType.quote:
+        return [" ".join(line.lstrip(">").strip() for line in lines)]
+    return [" ".join(lines)]
+
+
+def bench_pages(pages, workdir):
+    timer = Timer()
+    template = Template(template_text, "/")
+
+    paths = []
+    for rel_path, markdown in pages:
+        path = os.path.join(workdir, "content", rel_path)
+        dest = os.path.join(workdir, "stages", rel_path[:-3] + ".html")
+        for dir_path in (os.path.dirname(path), os.path.dirname(dest)):
+            os.makedirs(dir_path, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(markdown)
+        paths.append((path, dest))
+
+    for path, dest in paths:
+        with open(path, "r") as f:
+            markdown = timer.time("read", f.read)
+        blocks = timer.time("block_split", lambda: list(scan_blocks(markdown.split("\n"))))
+        block_types = timer.time("block_type", lambda: [lines_to_blocktype(block.lines) for block in blocks])
+
+        def parse_inline():
+            for block, block_type in zip(blocks, block_types):
+                for text in inline_text(block, block_type):
+                    text_to_textnodes(text)
+
+        timer.time("inline", parse_inline)
+        children = timer.time("convert", lambda: [block_to_html_node(block) for block in blocks])
+        html = timer.time("serialize", ParentNode("div", children).to_html)
+        out = timer.time("template", template.render, {"Title": "title", "Content": html})
+        with open(dest, "w") as f:
+            timer.time("write", f.write, out)
+
+    template_path = os.path.join(workdir, "template.html")
+    with open(template_path, "w") as f:
+        f.write(template_text)
+    found = find_pages(os.path.join(workdir, "content"), os.path.join(workdir, "docs"))
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            generate_pages(found, template_path, "/")
+        finally:
+            sys.stdout = stdout
+    timer.totals["build"] = time.perf_counter() - start
+    return timer.totals
+
+
+def run_corpus(name, scale, repeat, seed):
+    pages = corpora[name](random.Random(seed), scale)
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            totals = bench_pages(pages, workdir)
+        if best is None:
+            best = totals
+        else:
+            best = {stage: min(best[stage], totals[stage]) for stage in best}
+    return {
+        "pages": len(pages),
+        "chars": sum(len(markdown) for _, markdown in pages),
+        "seconds": best,
+    }
+
+
+def legacy_blocktype(lines):
+    # block_to_blocktype before the dispatch table, kept as the classify baseline
+    block_types = []
+    block = "\n".join(lines)
+    if block.startswith("# ") or block.startswith("## ") or block.startswith("### ") or block.startswith("#### ") or block.startswith("##### ") or block.startswith("###### "):
+        return BlockType.heading
+    elif block.startswith("```") and block.endswith("```"):
+        return BlockType.code
+    i = 1
+    for line in block.split("\n"):
+        if line.startswith(">"):
+            block_types.append(BlockType.quote)
+        elif line.startswith("- "):
+            block_types.append(BlockType.unordered_list)
+        elif line.startswith(f"{i}. "):
+            block_types.append(BlockType.ordered_list)
+        else:
+            block_types.append(BlockType.paragraph)
+        i += 1
+    b_type = block_types[0]
+    for block_type in block_types:
+        if block_type != b_type:
+            b_type = BlockType.paragraph
+    return b_type
+
+
+def run_classify(name, scale, repeat, seed):
+    pages = corpora[name](random.Random(seed), scale)
+    blocks = [block for _, markdown in pages for block in scan_blocks(markdown.split("\n"))]
+    # a list that breaks on its last line is the worst case for the old
+    # classifier: every line is classified before the last one turns it
+    # into a paragraph. Add a copy of each list with a plain last line
+    blocks += [
+        make_block(block.lines + ["not a list item"], 0)
+        for block in blocks
+        if block.block_type == BlockType.unordered_list
+    ]
+    seconds = {}
+    for label, classify in (("legacy", legacy_blocktype), ("dispatch", lines_to_blocktype)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for block in blocks:
+                classify(block.lines)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        seconds[label] = best
+    return {"pages": len(pages), "blocks": len(blocks), "seconds": seconds}
+
+
+def run_io(name, scale, repeat, seed):
+    rng = random.Random(seed)
+    pages = corpora[name](rng, scale)
+    with tempfile.TemporaryDirectory() as workdir:
+        sources = []
+        for i, (_, markdown) in enumerate(pages):
+            path = os.path.join(workdir, f"page-{i}.md")
+            with open(path, "w") as f:
+                f.write(markdown)
+            sources.append(path)
+        assets = []
+        for i in range(8):
+            path = os.path.join(workdir, f"asset-{i}.bin")
+            with open(path, "wb") as f:
+                f.write(rng.randbytes(int(16 * 2**20 * scale)))
+            assets.append(path)
+        read_bytes = sum(os.path.getsize(path) for path in sources)
+        copy_bytes = sum(os.path.getsize(path) for path in assets)
+
+        def read_all():
+            for path in sources:
+                fileio.read_text(path)
+
+        def read_lines():
+            for path in sources:
+                with fileio.open_lines(path) as lines:
+                    for _ in lines:
+                        pass
+
+        def copy_all():
+            for path in assets:
+                fileio.copy_file(path, path + ".copy")
+
+        seconds = {}
+        for backend in fileio.backends:
+            fileio.set_backend(backend)
+            for stage, func in (("read", read_all), ("lines", read_lines), ("copy", copy_all)):
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    func()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                    # every copy run starts from missing destinations
+                    for path in assets:
+                        if os.path.exists(path + ".copy"):
+                            os.remove(path + ".copy")
+                seconds[f"{stage}_{backend}"] = best
+        fileio.set_backend("buffered")
+
+    throughput = {}
+    for stage, seconds_taken in seconds.items():
+        size = copy_bytes if stage.startswith("copy") else read_bytes
+        throughput[stage] = size / 2**20 / seconds_taken if seconds_taken else 0
+    return {"pages": len(pages), "bytes_read": read_bytes, "bytes_copied": copy_bytes, "seconds": seconds, "mb_per_s": throughput}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_serve(name, scale, repeat, seed):
+    pages = corpora[name](random.Random(seed), scale)
+    best = None
+    with tempfile.TemporaryDirectory() as workdir:
+        urls = []
+        for rel_path, markdown in pages:
+            path = os.path.join(workdir, "content", rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(markdown)
+            urls.append("/" + rel_path[:-3] + ".html")
+        os.makedirs(os.path.join(workdir, "static"))
+        template_path = os.path.join(workdir, "template.html")
+        with open(template_path, "w") as f:
+            f.write(template_text)
+
+        for _ in range(repeat):
+            # a new site each run, so the first pass always renders
+            site = LazySite(os.path.join(workdir, "content"), os.path.join(workdir, "static"), template_path)
+            server = start_lazy_server(site, 0, quiet=True)
+            connection = http.client.HTTPConnection("localhost", server.server_address[1])
+            latencies = {}
+            try:
+                for label in ("cold", "warm"):
+                    latencies[label] = []
+                    for url in urls:
+                        start = time.perf_counter()
+                        connection.request("GET", url)
+                        response = connection.getresponse()
+                        response.read()
+                        latencies[label].append(time.perf_counter() - start)
+                        if response.status != 200:
+                            raise RuntimeError(f"{url}: {response.status}")
+            finally:
+                connection.close()
+                server.shutdown()
+                server.server_close()
+            if best is None or sum(latencies["warm"]) < sum(best["warm"]):
+                best = latencies
+
+    seconds = {}
+    for label, values in best.items():
+        seconds[label] = sum(values)
+        seconds[f"{label}_p50"] = percentile(values, 0.5)
+        seconds[f"{label}_p95"] = percentile(values, 0.95)
+    requests = {label: len(values) / sum(values) for label, values in best.items()}
+    return {"pages": len(pages), "seconds": seconds, "requests_per_s": requests}
+
+
+suites = {
+    "pipeline": run_corpus,
+    "classify": run_classify,
+    "io": run_io,
+    "serve": run_serve,
+}
+suite_corpora = {
+    "pipeline": ",".join(corpora),
+    "classify": "lists",
+    "io": "huge",
+    "serve": "small",
+}
+
+
+def compare(results, previous, threshold):
+    regressions = []
+    for name, result in results.items():
+        old = previous.get("results", {}).get(name)
+        if old is None:
+            continue
+        for stage, seconds in result["seconds"].items():
+            old_seconds = old["seconds"].get(stage)
+            if not old_seconds:
+                continue
+            change = seconds / old_seconds - 1
+            print(f"  {name:8}{stage:12}{old_seconds:10.4f}{seconds:10.4f}{change:+9.1%}")
+            # stages this short are mostly timer noise
+            if change > threshold and old_seconds >= 0.005:
+                regressions.append(f"{name}.{stage} {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown-to-HTML pipeline benchmarks")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every corpus size by this")
+    parser.add_argument("--suite", default="pipeline", choices=sorted(suites))
+    parser.add_argument("--corpus", help="comma separated corpora to run (default depends on the suite)")
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of N runs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.corpus is None:
+        args.corpus = suite_corpora[args.suite]
+
+    results = {}
+    for name in args.corpus.split(","):
+        if name not in corpora:
+            parser.error(f"unknown corpus: {name}")
+        result = suites[args.suite](name, args.scale, args.repeat, args.seed)
+        results[name] = result
+        stages = "  ".join(f"{stage} {seconds:.4f}" for stage, seconds in result["seconds"].items())
+        print(f"{name:8}{result['pages']:6} pages  {stages}")
+        if "mb_per_s" in result:
+            print("        MiB/s  " + "  ".join(f"{stage} {rate:.0f}" for stage, rate in result["mb_per_s"].items()))
+        if "requests_per_s" in result:
+            print("        req/s  " + "  ".join(f"{label} {rate:.0f}" for label, rate in result["requests_per_s"].items()))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "suite": args.suite,
+        "scale": args.scale,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            previous = json.load(f)
+        regressions = compare(results, previous, args.threshold)
+        if regressions:
+            print("regressions: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+import tracemalloc
+
+import blocks
+import htmlnode
+import inline
+import textnode
+
+
+# python3 src/bench_nodes.py [--paragraphs N]
+#
+# Renders a synthetic corpus twice: once with the slotted node classes and
+# once with plain subclasses that get a per-instance __dict__ again, which is
+# what the node classes looked like before they used __slots__.
+
+
+def make_corpus(paragraphs):
+    lines = []
+    for i in range(paragraphs):
+        lines.append(
+            f"Paragraph {i} has **bold {i}**, _italic_ and `code {i}` text with a "
+            f"[link {i}](/blog/{i}) and an ![image {i}](/images/{i}.png) in it."
+        )
+        lines.append("")
+        lines.append(f"- item {i}\n- item **{i + 1}**\n- item [{i + 2}](/x)")
+        lines.append("")
+    return "\n".join(lines)
+
+
+class dict_backed:
+    modules = (blocks, inline, htmlnode)
+    names = ("TextNode", "LeafNode", "ParentNode")
+
+    def __enter__(self):
+        self.saved = []
+        for module in self.modules:
+            for name in self.names:
+                cls = getattr(module, name, None)
+                if cls is None:
+                    continue
+                self.saved.append((module, name, cls))
+                # a subclass without __slots__ gets its __dict__ back
+                setattr(module, name, type(name, (cls,), {}))
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, cls in self.saved:
+            setattr(module, name, cls)
+
+
+def measure(markdown):
+    tracemalloc.start()
+    start = time.perf_counter()
+    node = blocks.markdown_to_html_node(markdown)
+    nodes = [inline.text_to_textnodes(line) for line in markdown.split("\n")]
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_alive = sum(stat.count for stat in snapshot.statistics("filename"))
+    size_alive = sum(stat.size for stat in snapshot.statistics("filename"))
+    del node, nodes
+    return {"seconds": elapsed, "peak": peak, "allocations": blocks_alive, "retained": size_alive}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Node memory benchmark")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    args = parser.parse_args()
+
+    markdown = make_corpus(args.paragraphs)
+    with dict_backed():
+        before = measure(markdown)
+    after = measure(markdown)
+
+    print(f"corpus: {args.paragraphs} paragraphs, {len(markdown)} chars")
+    print(f"instance size: TextNode {sys.getsizeof(textnode.TextNode('x', textnode.TextType.plain))} bytes, "
+          f"LeafNode {sys.getsizeof(htmlnode.LeafNode(None, 'x'))} bytes")
+    print(f"{'':12}{'peak MiB':>12}{'retained MiB':>14}{'live allocs':>14}{'seconds':>10}")
+    for label, result in (("__dict__", before), ("__slots__", after)):
+        print(
+            f"{label:12}{result['peak'] / 2**20:12.1f}{result['retained'] / 2**20:14.1f}"
+            f"{result['allocations']:14d}{result['seconds']:10.2f}"
+        )
+    print(f"peak memory saved: {1 - after['peak'] / before['peak']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
 from enum import Enum
-from htmlnode import HTMLNode, LeafNode, ParentNode # type: ignore
+import htmlnode # type: ignore
+from htmlnode import HTMLNode, LeafNode, ParentNode, rebase_urls # type: ignore
 from textnode import TextNode, TextType # type: ignore
 from inline import text_node_to_html_node, split_nodes_delimiter, extract_markdown_images, extract_markdown_links, split_nodes_link, split_nodes_image, text_to_textnodes # type: ignore
 
@@ -13,68 +20,292 @@ class BlockType(Enum):
     ordered_list = "ordered_list"
 
 
+class Block:
+    # a block of lines start..end (0-based, end exclusive) of the document, already classified
+    __slots__ = ("block_type", "lines", "start", "end")
+
+    def __init__(self, block_type, lines, start, end):
+        self.block_type = block_type
+        self.lines = lines
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __eq__(self, other):
+        return (self.block_type, self.lines, self.start, self.end) == (other.block_type, other.lines, other.start, other.end)
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.lines}, {self.start}, {self.end})"
+
+
+def scan_blocks(lines):
+    # lines is any iterable of lines (a list, or an open file for streaming).
+    # Blank lines separate blocks, except inside a fenced code block.
+    current = []
+    start = 0
+    fenced = False
+    number = 0
+    for number, line in enumerate(lines):
+        line = line.rstrip("\n")
+        if fenced:
+            current.append(line)
+            if line.rstrip().endswith("```"):
+                # the closing fence ends the block even without a blank line after it
+                fenced = False
+                yield make_block(current, start)
+                current = []
+            continue
+        if line.strip() == "":
+            if current:
+                yield make_block(current, start)
+                current = []
+            continue
+        if not current:
+            start = number
+            line = line.lstrip()
+            stripped = line.rstrip()
+            fenced = stripped.startswith("```") and (len(stripped) < 6 or not stripped.endswith("```"))
+        current.append(line)
+    if not current:
+        return
+    if fenced:
+        # an unclosed fence does not swallow the rest of the document
+        yield from scan_unfenced(current, start)
+    else:
+        yield make_block(current, start)
+
+
+def scan_unfenced(lines, start):
+    # the lines of an unclosed fence, split at blank lines and normalized
+    # like any other block: the first line of each loses its indentation
+    current = []
+    block_start = start
+    for number, line in enumerate(lines, start):
+        if line.strip() == "":
+            if current:
+                yield make_block(current, block_start)
+                current = []
+            continue
+        if not current:
+            block_start = number
+            line = line.lstrip()
+        current.append(line)
+    if current:
+        yield make_block(current, block_start)
+
+
+def make_block(lines, start):
+    lines[-1] = lines[-1].rstrip()
+    return Block(lines_to_blocktype(lines), lines, start, start + len(lines))
+
+
 def markdown_to_blocks(markdown):
-    block_list = []
-    
-    for block in markdown.split("\n\n"):
-        block = block.strip()
-        if block != "":
-            block_list.append(block)
+    return [block.text for block in scan_blocks(markdown.split("\n"))]
 
-    return block_list
 
 def block_to_blocktype(block):
-    block_types = []
-    
-    if block.startswith("# ") or block.startswith("## ") or block.startswith("### ") or block.startswith("#### ") or block.startswith("##### ") or block.startswith("###### "):
+    return lines_to_blocktype(block.split("\n"))
+
+
+def lines_to_blocktype(lines):
+    # the first character picks the only type the block can have; the
+    # classifier then stops at the first line that disagrees
+    classify = _classifiers.get(lines[0][:1])
+    if classify is None:
+        return BlockType.paragraph
+    return classify(lines)
+
+
+def _heading_type(lines):
+    first = lines[0]
+    level = len(first) - len(first.lstrip("#"))
+    if level <= 6 and first[level:level + 1] == " ":
         return BlockType.heading
-    elif block.startswith("```") and block.endswith("```"):
+    return BlockType.paragraph
+
+
+def _code_type(lines):
+    if lines[0].startswith("```") and lines[-1].endswith("```"):
         return BlockType.code
-    
-    lines = block.split("\n")
+    return BlockType.paragraph
+
+
+def _quote_type(lines):
+    for line in lines:
+        if not line.startswith(">"):
+            return BlockType.paragraph
+    return BlockType.quote
+
+
+def _ulist_type(lines):
+    for line in lines:
+        if not line.startswith("- "):
+            return BlockType.paragraph
+    return BlockType.unordered_list
+
+
+def _olist_type(lines):
     i = 1
     for line in lines:
-        if line.startswith(">"):
-            block_types.append(BlockType.quote)
-        elif line.startswith("- "):
-            block_types.append(BlockType.unordered_list)
-        elif line.startswith(f"{i}. ", ):
-            block_types.append(BlockType.ordered_list)
-        else:
-            block_types.append(BlockType.paragraph)
+        if not line.startswith(f"{i}. "):
+            return BlockType.paragraph
         i += 1
+    return BlockType.ordered_list
 
-    b_type = block_types[0]
-    for type in block_types:
-        if type != b_type:
-           b_type = BlockType.paragraph
-        
-    return b_type
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+_classifiers = {"#": _heading_type, "`": _code_type, ">": _quote_type, "-": _ulist_type, "1": _olist_type}
+
+
+def markdown_to_html_node(markdown, basepath=None, cache=None, visit=None):
+    return blocks_to_html_node(scan_blocks(markdown.split("\n")), basepath, cache, visit)
+
+
+def blocks_to_html_node(blocks, basepath=None, cache=None, visit=None):
+    # visit, if given, is called with every block as it is rendered
     children = []
     for block in blocks:
+        if visit is not None:
+            visit(block)
+        if cache is not None:
+            children.append(LeafNode(None, cache.render(block, basepath)))
+            continue
         html_node = block_to_html_node(block)
+        if basepath is not None:
+            rebase_urls(html_node, basepath)
         children.append(html_node)
     return ParentNode("div", children, None)
 
 
+# bump whenever the rendered HTML of a block changes, so persisted caches are dropped
+BLOCK_CACHE_VERSION = 1
+
+
+def iter_markdown_html(lines, basepath=None, cache=None, visit=None):
+    # same markup as markdown_to_html_node(...).to_html(), produced one block at a
+    # time so only the current block is ever held in memory
+    yield "<div>"
+    for block in scan_blocks(lines):
+        if visit is not None:
+            visit(block)
+        if cache is not None:
+            yield cache.render(block, basepath)
+            continue
+        html_node = block_to_html_node(block)
+        if basepath is not None:
+            rebase_urls(html_node, basepath)
+        yield from html_node.iter_html()
+    yield "</div>"
+
+
+class BlockCache:
+    # rendered HTML of blocks keyed by a hash of their text, least recently used evicted first
+    def __init__(self, max_bytes=64 * 2**20):
+        self.entries = OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # set to a list to remember which keys were rendered, see take_new_entries
+        self.new_keys = None
+
+    def render(self, block, basepath=None):
+        if isinstance(block, str):
+            block = make_block(block.split("\n"), 0)
+        key = block_key(block.text, basepath)
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+        self.misses += 1
+        html_node = block_to_html_node(block)
+        if basepath is not None:
+            rebase_urls(html_node, basepath)
+        html = html_node.to_html()
+        self.put(key, html)
+        if self.new_keys is not None:
+            self.new_keys.append(key)
+        return html
+
+    def put(self, key, html):
+        if key in self.entries:
+            self.size -= entry_size(key, self.entries.pop(key))
+        self.entries[key] = html
+        self.size += entry_size(key, html)
+        while self.size > self.max_bytes and self.entries:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.size -= entry_size(evicted_key, evicted)
+
+    def take_new_entries(self):
+        # entries rendered since the last call, for handing back from worker processes
+        entries = [(key, self.entries[key]) for key in self.new_keys or () if key in self.entries]
+        self.new_keys = []
+        return entries
+
+    def merge(self, entries, hits=0, misses=0):
+        for key, html in entries:
+            self.put(key, html)
+        self.hits += hits
+        self.misses += misses
+
+    def load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r") as f:
+            try:
+                saved = json.load(f)
+            except ValueError:
+                return
+        if not isinstance(saved, dict) or saved.get("version") != BLOCK_CACHE_VERSION:
+            return
+        for key, html in saved["entries"]:
+            self.put(key, html)
+
+    def save(self, path):
+        # per process, since shards built side by side share the cache file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": BLOCK_CACHE_VERSION, "entries": list(self.entries.items())}, f)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate), {len(self.entries)} blocks cached"
+
+
+# the OrderedDict's own cost per entry (hash table slot and list links), measured on CPython
+entry_overhead = 100
+
+
+def entry_size(key, html):
+    # what an entry really costs in memory, object headers included, so
+    # max_bytes bounds the process and not just the length of the HTML
+    return sys.getsizeof(key) + sys.getsizeof(html) + entry_overhead
+
+
+_root_url_re = re.compile(r"\]\(/([^()?#]*)")
+
+
+def block_key(block, basepath=None):
+    # the basepath is part of the key because cached HTML is already rebased,
+    # and so are the fingerprinted names of the assets the block links to
+    text = f"{basepath}\0{block}"
+    if htmlnode.asset_paths and "](/" in block:
+        text += "\0" + "\0".join(htmlnode.asset_paths.get(path, "") for path in _root_url_re.findall(block))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
 def block_to_html_node(block):
-    block_type = block_to_blocktype(block)
-    if block_type == BlockType.paragraph:
-        return paragraph_to_html_node(block)
-    if block_type == BlockType.heading:
-        return heading_to_html_node(block)
-    if block_type == BlockType.code:
-        return code_to_html_node(block)
-    if block_type == BlockType.ordered_list:
-        return olist_to_html_node(block)
-    if block_type == BlockType.unordered_list:
-        return ulist_to_html_node(block)
-    if block_type == BlockType.quote:
-        return quote_to_html_node(block)
-    raise ValueError("invalid block type")
+    if isinstance(block, str):
+        block = make_block(block.split("\n"), 0)
+    converter = _converters.get(block.block_type)
+    if converter is None:
+        raise ValueError("invalid block type")
+    return converter(block.lines)
 
 
 def text_to_children(text):
@@ -86,14 +317,14 @@ def text_to_children(text):
     return children
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def paragraph_to_html_node(lines):
     paragraph = " ".join(lines)
     children = text_to_children(paragraph)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines):
+    block = "\n".join(lines)
     level = 0
     for char in block:
         if char == "#":
@@ -107,38 +338,39 @@ def heading_to_html_node(block):
     return ParentNode(f"h{level}", children)
 
 
-def code_to_html_node(block):
-    if not block.startswith("```") or not block.endswith("```"):
+def code_to_html_node(lines):
+    if not lines[0].startswith("```") or not lines[-1].endswith("```"):
         raise ValueError("invalid code block")
-    text = block[4:-3]
+    if len(lines) == 1:
+        text = lines[0][3:-3]
+    else:
+        # the opening fence line (and any language after it) is not part of the code
+        text = "\n".join(lines[1:-1] + [lines[-1][:-3]])
     raw_text_node = TextNode(text, TextType.plain)
     child = text_node_to_html_node(raw_text_node)
     code = ParentNode("code", [child])
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(lines):
     html_items = []
-    for item in items:
-        text = item[3:]
+    for item in lines:
+        text = item[item.index(". ") + 2:]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(lines):
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[2:]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(lines):
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
@@ -148,3 +380,12 @@ def quote_to_html_node(block):
     children = text_to_children(content)
     return ParentNode("blockquote", children)
 
+
+_converters = {
+    BlockType.paragraph: paragraph_to_html_node,
+    BlockType.heading: heading_to_html_node,
+    BlockType.code: code_to_html_node,
+    BlockType.ordered_list: olist_to_html_node,
+    BlockType.unordered_list: ulist_to_html_node,
+    BlockType.quote: quote_to_html_node,
+}
@@ -0,0 +1,91 @@
+import os
+from pathlib import Path
+
+
+class BuildPlan:
+    # what a full build reads and writes, from one walk of content/ and
+    # static/: pages as (source, output) pairs, static files and the output
+    # directories both need, all as sorted "/"-separated relative paths
+    __slots__ = ("content_dir", "static_dir", "dest_dir", "sources", "static", "dirs")
+
+    def __init__(self, content_dir, static_dir, dest_dir, sources, static):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.dest_dir = dest_dir
+        self.sources = sources
+        self.static = static
+        self.dirs = parent_dirs([page_output(source) for source in sources] + static)
+
+    def pages(self):
+        return page_paths(self.content_dir, self.dest_dir, self.sources)
+
+    def make_dirs(self):
+        # every output directory in one pass, parents first, instead of a
+        # makedirs call per page
+        make_dirs(self.dest_dir, self.dirs)
+
+
+def plan_build(content_dir, static_dir, dest_dir):
+    return BuildPlan(content_dir, static_dir, dest_dir, scan_files(content_dir), scan_files(static_dir))
+
+
+def scan_files(dir_path):
+    # every file under dir_path, sorted so builds run in the same order on
+    # every machine. os.scandir reports whether an entry is a directory
+    # without the stat call os.path.isfile would make for each one
+    files = []
+    pending = [("", dir_path)]
+    while pending:
+        rel_dir, path = pending.pop()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append((rel_dir + entry.name + "/", entry.path))
+                else:
+                    files.append(rel_dir + entry.name)
+    files.sort()
+    return files
+
+
+def page_output(source):
+    root, _ = os.path.splitext(source)
+    return root + ".html"
+
+
+def page_paths(content_dir, dest_dir, sources):
+    # the (source path, output path) pairs find_pages always returned
+    return [
+        (os.path.join(content_dir, *source.split("/")), Path(dest_dir, page_output(source)))
+        for source in sources
+    ]
+
+
+def parent_dirs(rel_paths):
+    # every directory the paths need, ancestors included, sorted
+    dirs = set()
+    for rel_path in rel_paths:
+        dir_path = rel_path.rpartition("/")[0]
+        while dir_path and dir_path not in dirs:
+            dirs.add(dir_path)
+            dir_path = dir_path.rpartition("/")[0]
+    return sorted(dirs)
+
+
+def make_dirs(dest_dir, dirs):
+    # dirs is sorted, so a parent is always created before its children
+    os.makedirs(dest_dir, exist_ok=True)
+    for rel_path in dirs:
+        try:
+            os.mkdir(os.path.join(dest_dir, *rel_path.split("/")))
+        except FileExistsError:
+            pass
+
+
+def relative_path(path, dir_path):
+    # os.path.relpath makes both paths absolute on every call; a path joined
+    # onto dir_path, as every page path is, only needs the prefix cut off
+    path = os.path.normpath(path)
+    prefix = os.path.join(os.path.normpath(dir_path), "")
+    if path.startswith(prefix):
+        return path[len(prefix):]
+    return os.path.relpath(path, dir_path)
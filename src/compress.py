@@ -0,0 +1,173 @@
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli # type: ignore
+except ImportError:
+    brotli = None
+
+
+compressible = {".html", ".css", ".js", ".json", ".xml", ".svg", ".txt", ".map"}
+# below this, the headers of a compressed response cost more than they save
+min_size = 256
+
+
+def encoders():
+    found = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        found[".br"] = lambda data: brotli.compress(data, quality=11)
+    return found
+
+
+def find_compressible(dir_path):
+    files = []
+    for root, _, filenames in os.walk(dir_path):
+        for filename in filenames:
+            if os.path.splitext(filename)[1] in compressible:
+                files.append(os.path.join(root, filename))
+    return sorted(files)
+
+
+def compress_file(path, owned=()):
+    # writes path.gz (and path.br) unless one with the source's mtime exists;
+    # owned lists the suffixes whose existing copy an earlier run wrote, any
+    # other existing copy is a file of the site's own and is left alone.
+    # returns {suffix: (original bytes, compressed bytes)} for what was written
+    stat = os.stat(path)
+    written = {}
+    data = None
+    for suffix, encode in encoders().items():
+        dest_path = path + suffix
+        try:
+            mtime_ns = os.stat(dest_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns is not None and (suffix not in owned or mtime_ns == stat.st_mtime_ns):
+            continue
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = encode(data) if len(data) >= min_size else None
+        if compressed is None or len(compressed) >= len(data):
+            # not worth serving, and an older copy would be stale
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            continue
+        with open(dest_path, "wb") as f:
+            f.write(compressed)
+        os.utime(dest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        written[suffix] = (len(data), len(compressed))
+    return written
+
+
+def remove_orphans(dir_path, copies):
+    # of the copies precompress wrote (relative paths, updated in place),
+    # removes those whose source is gone, whose source changed since (every
+    # current copy carries its source's mtime) or whose encoder is no longer
+    # available, so they can never be refreshed
+    suffixes = encoders()
+    removed = 0
+    for copy in sorted(copies):
+        source, suffix = os.path.splitext(copy)
+        path = os.path.join(dir_path, *copy.split("/"))
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            copies.discard(copy)
+            continue
+        if suffix in suffixes:
+            try:
+                if os.stat(os.path.join(dir_path, *source.split("/"))).st_mtime_ns == mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+        os.remove(path)
+        copies.discard(copy)
+        removed += 1
+    return removed
+
+
+def load_state(state_path):
+    # {"encoders": [...], "files": {relative path: [size, mtime_ns]} of the
+    # files the last run handled, compressed or not, "copies": [relative
+    # paths of the .gz and .br files it wrote]}
+    empty = {"encoders": None, "files": {}, "copies": []}
+    if state_path is None or not os.path.exists(state_path):
+        return empty
+    with open(state_path) as f:
+        try:
+            saved = json.load(f)
+        except ValueError:
+            return empty
+    if not isinstance(saved, dict) or not isinstance(saved.get("files"), dict):
+        return empty
+    return saved
+
+
+def save_state(state_path, suffixes, files, copies):
+    with open(state_path, "w") as f:
+        json.dump({"encoders": suffixes, "files": files, "copies": sorted(copies)}, f)
+
+
+def adopt_copies(dir_path, files):
+    # a state saved before copies were listed: the copies that run wrote carry
+    # the mtime it recorded for their source
+    copies = set()
+    for rel_path, (_, mtime_ns) in files.items():
+        for suffix in (".gz", ".br"):
+            try:
+                if os.stat(os.path.join(dir_path, *(rel_path + suffix).split("/"))).st_mtime_ns == mtime_ns:
+                    copies.add(rel_path + suffix)
+            except FileNotFoundError:
+                pass
+    return copies
+
+
+def precompress(dir_path, jobs=1, state_path=None):
+    # with a state_path, files unchanged since the last run are not read
+    # again, including those too small or too random to be worth compressing,
+    # and only .gz and .br files precompress wrote itself are ever replaced or
+    # removed. Without one, no earlier copy is known to be ours
+    suffixes = sorted(encoders())
+    state = load_state(state_path)
+    # a run with other encoders has to look at everything again
+    previous = state["files"] if state["encoders"] == suffixes else {}
+    copies = set(state["copies"]) if "copies" in state else adopt_copies(dir_path, state["files"])
+    current = {}
+    files = []
+    for path in find_compressible(dir_path):
+        stat = os.stat(path)
+        rel_path = os.path.relpath(path, dir_path).replace(os.sep, "/")
+        current[rel_path] = [stat.st_size, stat.st_mtime_ns]
+        if previous.get(rel_path) != current[rel_path]:
+            files.append((path, rel_path))
+    owned = [{suffix for suffix in suffixes if rel_path + suffix in copies} for _, rel_path in files]
+    paths = [path for path, _ in files]
+    if jobs <= 1 or len(files) <= 1:
+        results = [compress_file(path, owns) for path, owns in zip(paths, owned)]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(compress_file, paths, owned, chunksize=16))
+    for (_, rel_path), written in zip(files, results):
+        copies.update(rel_path + suffix for suffix in written)
+    removed = remove_orphans(dir_path, copies)
+    if state_path is not None:
+        save_state(state_path, suffixes, current, copies)
+
+    totals = {}
+    for written in results:
+        for suffix, (original, compressed) in written.items():
+            count, before, after = totals.get(suffix, (0, 0, 0))
+            totals[suffix] = (count + 1, before + original, after + compressed)
+    compressed_files = sum(1 for written in results if written)
+    print(
+        f"Precompressed {compressed_files} of {len(current)} files ({len(current) - len(files)} unchanged since the last run, "
+        f"{len(files) - compressed_files} up to date or too small), {removed} stale copies removed"
+    )
+    for suffix, (count, before, after) in sorted(totals.items()):
+        print(f"  {suffix}: {count} files, {before} -> {after} bytes, {before - after} bytes saved ({1 - after / before:.0%})")
+    if brotli is None:
+        print("  .br: skipped, the brotli module is not installed")
+    return totals
@@ -1,16 +1,88 @@
 import os
 import shutil
 
+import fileio # type: ignore
+from buildplan import make_dirs, parent_dirs, scan_files # type: ignore
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
+def copy_files_recursive(source_dir_path, dest_dir_path, link=False):
+    files = scan_files(source_dir_path)
+    make_dirs(dest_dir_path, parent_dirs(files))
+    copy_files(source_dir_path, dest_dir_path, files, link)
+
+
+def copy_files(source_dir_path, dest_dir_path, files, link=False):
+    # files are "/"-separated relative paths, e.g. a build plan's static
+    # files; their directories must already exist under dest_dir_path
+    for rel_path in files:
+        parts = rel_path.split("/")
+        from_path = os.path.join(source_dir_path, *parts)
+        dest_path = os.path.join(dest_dir_path, *parts)
+        print(f" * {from_path} -> {dest_path}")
+        copy_file(from_path, dest_path, link)
+
+
+def sync_files_recursive(source_dir_path, dest_dir_path, synced, link=False, files=None):
+    # copies only new or changed files; synced maps each relative path copied by
+    # the previous sync to its [size, mtime_ns] and is replaced by the new state.
+    # files, if given, are the "/"-separated relative paths found by an earlier
+    # walk of source_dir_path. Returns the relative paths that were copied or removed.
+    current = {}
+    changed = []
+    for rel_path in scan_files(source_dir_path) if files is None else files:
+        from_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        stat = os.stat(from_path)
+        current[rel_path] = [stat.st_size, stat.st_mtime_ns]
+        if is_up_to_date(stat, dest_path):
+            continue
         print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
-        else:
-            copy_files_recursive(from_path, dest_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(from_path, dest_path, link)
+        changed.append(rel_path)
+
+    copied = len(changed)
+    for rel_path in synced:
+        if rel_path not in current:
+            changed.append(rel_path)
+            dest_path = os.path.join(dest_dir_path, rel_path)
+            if os.path.exists(dest_path):
+                print(f" - removing {dest_path}")
+                os.remove(dest_path)
+            prune_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+    print(f"{copied} static files copied, {len(current) - copied} unchanged, {len(changed) - copied} removed")
+    synced.clear()
+    synced.update(current)
+    return changed
+
+
+def prune_empty_dirs(dir_path, root_dir_path):
+    # removes dir_path and its parents while they are empty, but never the root itself
+    root = os.path.abspath(root_dir_path)
+    while os.path.abspath(dir_path) != root and os.path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+
+def is_up_to_date(source_stat, dest_path):
+    # copies keep the source mtime (copystat) and hard links share the inode,
+    # so an unchanged asset always has the same size and mtime as its source
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    return dest_stat.st_size == source_stat.st_size and dest_stat.st_mtime_ns == source_stat.st_mtime_ns
+
+
+def copy_file(from_path, dest_path, link=False):
+    if link:
+        if os.path.lexists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            # different filesystem or no hard link support
+            pass
+    fileio.copy_file(from_path, dest_path)
+    shutil.copystat(from_path, dest_path)
@@ -0,0 +1,95 @@
+import os
+import posixpath
+
+
+class DependencyGraph:
+    # edges from each output (a path relative to docs/) to the inputs it was
+    # built from: "template", "basepath", "content:<source>" and
+    # "static:<asset>" for the static files its links and images point at.
+    # dependents is the reverse index, so a stale query only touches the
+    # outputs that depend on the changed inputs.
+    def __init__(self):
+        self.inputs = {}
+        self.dependents = {}
+        self.links = {}
+
+    def record(self, output, inputs, links=()):
+        self.remove(output)
+        self.inputs[output] = sorted(set(inputs))
+        for key in self.inputs[output]:
+            self.dependents.setdefault(key, set()).add(output)
+        self.links[output] = sorted(set(links))
+
+    def remove(self, output):
+        for key in self.inputs.pop(output, ()):
+            outputs = self.dependents[key]
+            outputs.discard(output)
+            if not outputs:
+                del self.dependents[key]
+        self.links.pop(output, None)
+
+    def stale(self, changed_inputs):
+        outputs = set()
+        for key in changed_inputs:
+            outputs.update(self.dependents.get(key, ()))
+        return outputs
+
+    def broken_links(self, targets, outputs=None):
+        # internal links whose target is neither a page nor a static file,
+        # from every output or only from the given ones
+        broken = []
+        if outputs is None:
+            outputs = self.links
+        for output in sorted(outputs):
+            for url in self.links.get(output, ()):
+                if resolve_target(output, url, targets) is None:
+                    broken.append((output, url))
+        return broken
+
+    def to_dict(self):
+        return {"inputs": self.inputs, "links": self.links}
+
+    @classmethod
+    def from_dict(cls, data):
+        graph = cls()
+        for output, inputs in data.get("inputs", {}).items():
+            graph.record(output, inputs, data.get("links", {}).get(output, ()))
+        return graph
+
+
+def internal_path(output, url):
+    # the site-relative path a link points at, or None for external links
+    if "://" in url or url.startswith(("//", "mailto:", "#")):
+        return None
+    url = url.split("#", 1)[0].split("?", 1)[0]
+    if url.startswith("/"):
+        return posixpath.normpath(url).lstrip("/")
+    path = posixpath.normpath(posixpath.join(posixpath.dirname(output), url))
+    return "" if path == "." else path
+
+
+def resolve_target(output, url, targets):
+    # the output or static file a link lands on; "" for external links
+    path = internal_path(output, url)
+    if path is None:
+        return ""
+    for candidate in (path, posixpath.join(path, "index.html"), path + ".html"):
+        if candidate in targets:
+            return candidate
+    return None
+
+
+def page_inputs(output, source, info):
+    # every internal link and image may name a static file, including one
+    # that does not exist yet: adding it must rebuild the page, whose link
+    # was broken or, with fingerprinting, points at the unhashed name
+    inputs = ["template", "basepath", "content:" + source]
+    for url in info.images + info.links:
+        path = internal_path(output, url)
+        if path:
+            inputs.append("static:" + path)
+    return inputs
+
+
+def as_posix(rel_path):
+    return rel_path.replace(os.sep, "/")
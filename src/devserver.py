@@ -0,0 +1,103 @@
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from assets import fingerprint_re # type: ignore
+
+
+reload_path = "/__livereload"
+reload_script = (
+    f'<script>new EventSource("{reload_path}").onmessage = function () {{ location.reload(); }};</script>'
+)
+
+
+class ReloadNotifier:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, seen, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+
+def inject_reload_script(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + reload_script
+    return html[:index] + reload_script + html[index:]
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, notifier=None, **kwargs):
+        self.notifier = notifier
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == reload_path:
+            self.send_events()
+            return
+        url_path = self.path.split("?", 1)[0].split("#", 1)[0]
+        path = self.translate_path(url_path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        # directories without a trailing slash fall through so the base class can redirect
+        if url_path.endswith(("/", ".html")) and path.endswith(".html") and os.path.isfile(path):
+            self.send_page(path)
+            return
+        super().do_GET()
+
+    def end_headers(self):
+        # a fingerprinted name changes whenever the file does
+        if fingerprint_re.search(self.path.split("?", 1)[0]):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        super().end_headers()
+
+    def send_page(self, path):
+        with open(path, "r") as f:
+            body = inject_reload_script(f.read()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        # server-sent events: one "reload" message per rebuild, comments as keep-alives
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        seen = self.notifier.version
+        try:
+            while True:
+                version = self.notifier.wait(seen, timeout=15)
+                if version == seen:
+                    self.wfile.write(b": ping\n\n")
+                else:
+                    seen = version
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        if self.path != reload_path:
+            super().log_message(format, *args)
+
+
+def start_server(directory, port, notifier):
+    handler = functools.partial(DevRequestHandler, directory=directory, notifier=notifier)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,115 @@
+import contextlib
+import mmap
+import os
+import shutil
+
+
+# "buffered" uses plain open()/shutil; "mmap" memory-maps sources and copies
+# files with copy_file_range/sendfile so the bytes never pass through Python
+backends = ("buffered", "mmap")
+backend = "buffered"
+
+
+def set_backend(name):
+    global backend
+    if name not in backends:
+        raise ValueError(f"unknown io backend: {name}")
+    backend = name
+
+
+def read_text(path):
+    if backend == "buffered":
+        with open(path, "r") as f:
+            return f.read()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # decoded straight from the mapping, without copying it to bytes first
+            return _universal_newlines(str(mapped, "utf-8"))
+
+
+def _universal_newlines(text):
+    # what a text-mode open() does: "\r\n" and a lone "\r" both end a line
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+@contextlib.contextmanager
+def open_lines(path):
+    # an iterable of the file's lines, each ending in "\n" like a text-mode file's
+    if backend == "buffered":
+        with open(path, "r") as f:
+            yield f
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield iter(())
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield _decode_lines(mapped)
+
+
+def _decode_lines(mapped, chunk_size=1 << 20):
+    # decodes about a chunk at a time, cut at a line break, so memory stays
+    # bounded by the chunk size while the kernel pages the mapping in
+    pos = 0
+    size = len(mapped)
+    while pos < size:
+        end = min(pos + chunk_size, size)
+        if end < size:
+            newline = mapped.find(b"\n", end - 1)
+            end = size if newline == -1 else newline + 1
+        text = _universal_newlines(str(memoryview(mapped)[pos:end], "utf-8"))
+        pos = end
+        lines = text.split("\n")
+        last = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if last:
+            yield last
+
+
+def copy_file(from_path, dest_path):
+    # copies contents only, like shutil.copyfile
+    if backend == "buffered":
+        shutil.copyfile(from_path, dest_path)
+        return
+    with open(from_path, "rb") as source, open(dest_path, "wb") as dest:
+        size = os.fstat(source.fileno()).st_size
+        for copy in (_copy_file_range, _sendfile):
+            try:
+                if copy(source.fileno(), dest.fileno(), size):
+                    return
+            except OSError:
+                # not supported for this pair of files, e.g. across filesystems
+                pass
+            os.lseek(source.fileno(), 0, os.SEEK_SET)
+            dest.seek(0)
+            dest.truncate()
+        shutil.copyfileobj(source, dest)
+
+
+def _copy_file_range(source_fd, dest_fd, size):
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(source_fd, dest_fd, size - copied)
+        if sent == 0:
+            break
+        copied += sent
+    return True
+
+
+def _sendfile(source_fd, dest_fd, size):
+    if not hasattr(os, "sendfile"):
+        return False
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(dest_fd, source_fd, copied, size - copied)
+        if sent == 0:
+            break
+        copied += sent
+    return True
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+
+class ScratchDir:
+    # a temporary directory for each test, self.root; with chdir = True the
+    # test runs inside it. Mix in ahead of unittest.TestCase and call
+    # super().setUp() first; the directory goes after the test's own tearDown
+    chdir = False
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        if self.chdir:
+            self.addCleanup(os.chdir, os.getcwd())
+            os.chdir(self.root)
+
+    def write(self, path, text, mtime_ns=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def read_tree(self, root):
+        # {relative path: text} of every file under root
+        tree = {}
+        for dir_path, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                with open(path) as f:
+                    tree[os.path.relpath(path, root)] = f.read()
+        return tree
@@ -1,48 +1,438 @@
+import asyncio
 import os
-from pathlib import Path
-from blocks import markdown_to_html_node # type: ignore
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import fileio # type: ignore
+import htmlnode # type: ignore
+from buildplan import page_paths, relative_path, scan_files # type: ignore
+from copystatic import prune_empty_dirs # type: ignore
+from blocks import markdown_to_html_node, iter_markdown_html, blocks_to_html_node, scan_blocks # type: ignore
+from depgraph import as_posix, page_inputs # type: ignore
+from manifest import hash_file # type: ignore
+from minify import minify_chunks # type: ignore
+from pageinfo import PageInfo # type: ignore
+from profiling import BuildProfile, PageProfile, count_nodes # type: ignore
+from template import load_template, template_assets # type: ignore
+
+
+# shared by every page rendered in this process, see set_block_cache
+block_cache = None
+# sources larger than this are rendered block by block instead of being read whole
+stream_threshold = 8 * 2**20
+# a BuildProfile while --profile is on, see set_profile
+build_profile = None
+# whether pages are minified as they are written, see set_minify
+minify_output = False
+
+
+class PageError(Exception):
+    def __init__(self, from_path, message):
+        super().__init__(from_path, message)
+        self.from_path = from_path
+        self.message = message
+
+    def __str__(self):
+        return f"{self.from_path}: {self.message}"
+
+
+def set_block_cache(cache):
+    global block_cache
+    block_cache = cache
+
+
+def set_profile(profile):
+    global build_profile
+    build_profile = profile
+
+
+def set_minify(enabled):
+    global minify_output
+    minify_output = enabled
 
 
 def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for filename in os.listdir(dir_path_content):
-        from_path = os.path.join(dir_path_content, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path, basepath)
+    for from_path, dest_path in find_pages(dir_path_content, dest_dir_path):
+        generate_page(from_path, template_path, dest_path, basepath)
+
+
+def generate_pages(pages, template_path, basepath, jobs=1, io_depth=0):
+    # returns the PageInfo of every page, keyed by source path
+    if io_depth > 0 and jobs <= 1 and build_profile is None:
+        return asyncio.run(generate_pages_async(pages, template_path, basepath, io_depth))
+    infos = {}
+    if jobs <= 1 or len(pages) <= 1:
+        for from_path, dest_path in pages:
+            try:
+                infos[from_path] = generate_page(from_path, template_path, dest_path, basepath)
+            except Exception as e:
+                raise PageError(from_path, str(e)) from e
+        return infos
+
+    errors = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(block_cache, fileio.backend, build_profile is not None, htmlnode.asset_paths, minify_output)) as executor:
+        futures = {}
+        for from_path, dest_path in pages:
+            future = executor.submit(_generate_page_worker, from_path, template_path, dest_path, basepath)
+            futures[future] = (from_path, dest_path)
+        done = 0
+        for future in as_completed(futures):
+            from_path, dest_path = futures[future]
+            done += 1
+            try:
+                worker, hits, misses, entries, page_profile, info = future.result()
+            except PageError as e:
+                print(f" ! [{done}/{len(pages)}] {e}")
+                errors.append(e)
+                continue
+            if block_cache is not None:
+                block_cache.merge(entries, hits, misses)
+            if build_profile is not None:
+                build_profile.add(page_profile)
+            infos[from_path] = info
+            print(f" * [{done}/{len(pages)}] worker {worker}: {from_path} -> {dest_path}")
+
+    if errors:
+        first = errors[0]
+        raise PageError(first.from_path, f"{first.message} ({len(errors)} of {len(pages)} pages failed)")
+    return infos
+
+
+async def generate_pages_async(pages, template_path, basepath, depth=4):
+    # reads, renders and writes overlap: up to depth sources are read ahead on
+    # threads and up to depth rendered pages wait for a writer thread, so the
+    # CPU keeps rendering while the disk works; rendering stays on this thread
+    read_queue = asyncio.Queue(maxsize=depth)
+    write_queue = asyncio.Queue(maxsize=depth)
+    template = load_template(template_path, basepath)
+    errors = []
+    infos = {}
+
+    # depth readers take pages off one iterator, so depth reads are in flight
+    unread = iter(pages)
+
+    async def read():
+        for from_path, dest_path in unread:
+            try:
+                markdown_content = await asyncio.to_thread(_read_source, from_path)
+            except Exception as e:
+                markdown_content = PageError(from_path, str(e))
+            await read_queue.put((from_path, dest_path, markdown_content))
+
+    async def read_all():
+        await asyncio.gather(*(read() for _ in range(depth)))
+        await read_queue.put(None)
+
+    async def render():
+        while (item := await read_queue.get()) is not None:
+            from_path, dest_path, markdown_content = item
+            try:
+                if isinstance(markdown_content, PageError):
+                    raise markdown_content
+                if markdown_content is None:
+                    # too large to buffer, stream it on a thread of its own
+                    info = await asyncio.to_thread(write_page_streaming, from_path, template_path, dest_path, basepath)
+                    html = None
+                else:
+                    info = PageInfo()
+                    node = markdown_to_html_node(markdown_content, basepath, block_cache, info.add_block)
+                    info.title = title = extract_title(markdown_content)
+                    html = "".join(page_chunks(template, {"Title": title, "Content": node.to_html()}))
+            except Exception as e:
+                errors.append(e if isinstance(e, PageError) else PageError(from_path, str(e)))
+                print(f" ! {errors[-1]}")
+                continue
+            infos[from_path] = info
+            await write_queue.put((from_path, dest_path, html))
+        for _ in range(depth):
+            await write_queue.put(None)
+
+    async def write():
+        while (item := await write_queue.get()) is not None:
+            from_path, dest_path, html = item
+            try:
+                if html is not None:
+                    await asyncio.to_thread(_write_output, dest_path, html)
+            except Exception as e:
+                errors.append(PageError(from_path, str(e)))
+                print(f" ! {errors[-1]}")
+                del infos[from_path]
+                continue
+            print(f" * {from_path} {template_path} -> {dest_path}")
+
+    await asyncio.gather(read_all(), render(), *(write() for _ in range(depth)))
+    if errors:
+        first = errors[0]
+        raise PageError(first.from_path, f"{first.message} ({len(errors)} of {len(pages)} pages failed)")
+    return infos
+
+
+def _read_source(from_path):
+    # None tells the render stage to stream the page instead
+    if os.path.getsize(from_path) > stream_threshold:
+        return None
+    return fileio.read_text(from_path)
+
+
+def _write_output(dest_path, html):
+    with open_output(dest_path) as to_file:
+        to_file.write(html)
+
+
+def open_output(dest_path):
+    # a build plan creates the output directories up front, so only a page
+    # written without one pays for creating its directory
+    try:
+        return open(dest_path, "w")
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        return open(dest_path, "w")
+
+
+def _init_worker(cache, io_backend, profiling, asset_paths, minify):
+    fileio.set_backend(io_backend)
+    set_minify(minify)
+    htmlnode.set_asset_paths(asset_paths)
+    set_profile(BuildProfile() if profiling else None)
+    set_block_cache(cache)
+    if cache is not None:
+        cache.new_keys = []
+
+
+def _generate_page_worker(from_path, template_path, dest_path, basepath):
+    cache = block_cache
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+    try:
+        info = write_page(from_path, template_path, dest_path, basepath)
+    except Exception as e:
+        raise PageError(from_path, str(e)) from None
+    page_profile = build_profile.pages.pop() if build_profile is not None else None
+    if cache is None:
+        return os.getpid(), 0, 0, [], page_profile, info
+    # the parent keeps the statistics and the entries worth persisting
+    return os.getpid(), cache.hits - hits, cache.misses - misses, cache.take_new_entries(), page_profile, info
+
+
+def find_pages(dir_path_content, dest_dir_path):
+    # (source, output) for every page, in sorted order
+    return page_paths(dir_path_content, dest_dir_path, scan_files(dir_path_content))
+
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath, manifest, jobs=1, io_depth=0, static_changed=(), pages=None, sources_changed=None):
+    # static_changed holds the paths under static/ that were copied or removed
+    # since the last build; manifest["static"] must already list the current ones.
+    # pages, if given, is find_pages() from a build plan. sources_changed, if
+    # given, holds every path under content/ that changed or went away since
+    # the manifest was last updated, as a watcher reports them; only those are
+    # looked at and pages is not needed. Returns whether the index metadata
+    # changed, i.e. whether the site indexes need rewriting
+    graph = manifest["graph"]
+    changed = {"static:" + as_posix(rel_path) for rel_path in static_changed}
+    template_hash = hash_file(template_path)
+    if manifest["template"] != template_hash:
+        changed.add("template")
+    if manifest["basepath"] != basepath:
+        changed.add("basepath")
+    if manifest["minify"] != minify_output:
+        changed.add("template")
+    # the template's own links carry fingerprinted names too
+    if htmlnode.asset_paths and changed & {"static:" + path for path in template_assets(template_path)}:
+        changed.add("template")
+    old_pages = manifest["pages"]
+    stale = []
+
+    if sources_changed is None:
+        if pages is None:
+            pages = find_pages(dir_path_content, dest_dir_path)
+        new_pages = {}
+    else:
+        new_pages = dict(old_pages)
+        keys = sorted({relative_path(path, dir_path_content) for path in sources_changed})
+        # the template and static files are reported too; they are not pages
+        keys = [key for key in keys if key.split(os.sep)[0] != os.pardir]
+        pages = page_paths(dir_path_content, dest_dir_path, [as_posix(key) for key in keys])
+    # whether pages came or went, which can break or mend links anywhere
+    moved = False
+    for from_path, dest_path in pages:
+        key = relative_path(from_path, dir_path_content)
+        old = old_pages.get(key)
+        moved = moved or old is None
+        try:
+            stat = os.stat(from_path)
+        except FileNotFoundError:
+            # removed since the watcher saw it
+            new_pages.pop(key, None)
+            continue
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        if old is not None and old.get("stamp") == stamp:
+            # only sources whose size or mtime moved are read and hashed
+            entry = old
         else:
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
+            entry = {
+                "hash": hash_file(from_path),
+                "dest": relative_path(dest_path, dest_dir_path),
+                "stamp": stamp,
+            }
+        new_pages[key] = entry
+        if old is None or old["hash"] != entry["hash"] or old["dest"] != entry["dest"] or as_posix(entry["dest"]) not in graph.inputs or not os.path.exists(dest_path):
+            stale.append((from_path, dest_path))
+    # pages whose own source is unchanged but that depend on a changed input
+    dependents = graph.stale(changed)
+    if dependents:
+        queued = {from_path for from_path, _ in stale}
+        sources = {as_posix(entry["dest"]): as_posix(key) for key, entry in new_pages.items()}
+        for page in page_paths(dir_path_content, dest_dir_path, [sources[output] for output in sorted(dependents) if output in sources]):
+            if page[0] not in queued:
+                stale.append(page)
+    infos = generate_pages(stale, template_path, basepath, jobs, io_depth)
+
+    meta = manifest["meta"]
+    meta_changed = False
+    for key, entry in old_pages.items():
+        if key not in new_pages:
+            remove_output(os.path.join(dest_dir_path, entry["dest"]), dest_dir_path)
+            graph.remove(as_posix(entry["dest"]))
+            meta.pop(as_posix(entry["dest"]), None)
+            meta_changed = moved = True
+
+    static_files = {as_posix(rel_path) for rel_path in manifest["static"]}
+    outputs = [as_posix(relative_path(dest_path, dest_dir_path)) for _, dest_path in stale]
+    old_meta = [meta.get(output) for output in outputs]
+    record_pages(graph, stale, infos, dir_path_content, dest_dir_path, meta)
+    meta_changed = meta_changed or old_meta != [meta[output] for output in outputs]
+    # a watched rebuild that only re-rendered pages re-checks just their links
+    if sources_changed is None or moved or static_changed:
+        report_broken_links(graph, static_files)
+    else:
+        report_broken_links(graph, static_files, outputs)
+    manifest["template"] = template_hash
+    manifest["basepath"] = basepath
+    manifest["minify"] = minify_output
+    manifest["pages"] = new_pages
+    print(f"{len(stale)} pages generated, {len(new_pages) - len(stale)} unchanged")
+    return meta_changed
+
+
+def record_pages(graph, pages, infos, dir_path_content, dest_dir_path, meta=None):
+    # adds the rendered pages to the graph and, if given, their index metadata to meta
+    for from_path, dest_path in pages:
+        info = infos[from_path]
+        source = as_posix(relative_path(from_path, dir_path_content))
+        output = as_posix(relative_path(dest_path, dest_dir_path))
+        graph.record(output, page_inputs(output, source, info), info.links + info.images)
+        if meta is not None:
+            meta[output] = info.to_dict(source)
+
+
+def report_broken_links(graph, static_files, outputs=None):
+    # links to pages this build did not render count as broken too
+    broken = graph.broken_links(set(graph.inputs) | static_files, outputs)
+    for output, url in broken:
+        print(f" ! broken link in {output}: {url}")
+    return broken
+
+
+def remove_output(dest_path, dest_dir_path):
+    if os.path.exists(dest_path):
+        print(f" - removing {dest_path}")
+        os.remove(dest_path)
+    # directories left empty by the removal go too
+    prune_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
 
 
 def generate_page(from_path, template_path, dest_path, basepath):
     print(f" * {from_path} {template_path} -> {dest_path}")
-    from_file = open(from_path, "r")
-    markdown_content = from_file.read()
-    from_file.close()
+    return write_page(from_path, template_path, dest_path, basepath)
+
+
+def write_page(from_path, template_path, dest_path, basepath):
+    # returns the PageInfo collected while rendering
+    if build_profile is not None:
+        return write_page_profiled(from_path, template_path, dest_path, basepath)
+    if os.path.getsize(from_path) > stream_threshold:
+        return write_page_streaming(from_path, template_path, dest_path, basepath)
 
-    template_file = open(template_path, "r")
-    template = template_file.read()
-    template_file.close()
+    markdown_content = fileio.read_text(from_path)
 
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
+    info = PageInfo()
+    template = load_template(template_path, basepath)
+    node = markdown_to_html_node(markdown_content, basepath, block_cache, info.add_block)
+    info.title = title = extract_title(markdown_content)
 
+    with open_output(dest_path) as to_file:
+        to_file.writelines(page_chunks(template, {"Title": title, "Content": node}))
+    return info
+
+
+def render_page(from_path, template_path, basepath):
+    # the finished page as a string, for serving without writing it out
+    markdown_content = fileio.read_text(from_path)
+    template = load_template(template_path, basepath)
+    node = markdown_to_html_node(markdown_content, basepath, block_cache)
     title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', 'href="' + basepath)
-    template = template.replace('src="/', 'src="' + basepath)
+    return "".join(page_chunks(template, {"Title": title, "Content": node}))
+
+
+def write_page_streaming(from_path, template_path, dest_path, basepath):
+    # the title goes in the template prefix, so find it first; it is
+    # normally near the top and this pass stops as soon as it is found
+    with fileio.open_lines(from_path) as lines:
+        title = extract_title_from_lines(lines)
+
+    template = load_template(template_path, basepath)
+    info = PageInfo()
+    info.title = title
+    with fileio.open_lines(from_path) as lines, open_output(dest_path) as to_file:
+        # no block cache: keeping every block of a huge page would undo the point
+        # of streaming it, and its blocks are rarely shared with other pages
+        content = iter_markdown_html(lines, basepath, None, info.add_block)
+        to_file.writelines(page_chunks(template, {"Title": title, "Content": content}))
+    return info
+
+
+def write_page_profiled(from_path, template_path, dest_path, basepath):
+    # write_page split into separately timed stages; the output is the same
+    profile = PageProfile(from_path)
+    if os.path.getsize(from_path) > stream_threshold:
+        info = profile.time("stream", write_page_streaming, from_path, template_path, dest_path, basepath)
+        build_profile.add(profile)
+        return info
+
+    markdown_content = profile.time("read", fileio.read_text, from_path)
+    blocks = profile.time("block_parse", lambda: list(scan_blocks(markdown_content.split("\n"))))
+    info = PageInfo()
+    # no block cache: a cached block is one prerendered leaf, which would hide
+    # its nodes and move its to_html time into inline_parse
+    node = profile.time("inline_parse", blocks_to_html_node, blocks, basepath, None, info.add_block)
+    html = profile.time("to_html", node.to_html)
+    profile.nodes = count_nodes(node)
 
-    dest_dir_path = os.path.dirname(dest_path)
-    if dest_dir_path != "":
-        os.makedirs(dest_dir_path, exist_ok=True)
-    to_file = open(dest_path, "w")
-    to_file.write(template)
+    def fill_template():
+        template = load_template(template_path, basepath)
+        info.title = title = extract_title(markdown_content)
+        return "".join(page_chunks(template, {"Title": title, "Content": html}))
+
+    page = profile.time("template", fill_template)
+
+    def write():
+        with open_output(dest_path) as to_file:
+            to_file.write(page)
+
+    profile.time("write", write)
+    build_profile.add(profile)
+    return info
+
+
+def page_chunks(template, values):
+    chunks = template.iter_chunks(values)
+    return minify_chunks(chunks) if minify_output else chunks
 
 
 def extract_title(md):
-    lines = md.split("\n")
+    return extract_title_from_lines(md.split("\n"))
+
+
+def extract_title_from_lines(lines):
     for line in lines:
         if line.startswith("# "):
-            return line[2:]
+            return line[2:].rstrip("\n")
     raise ValueError("no title found")
@@ -1,5 +1,8 @@
 
 class HTMLNode:
+    # the inline pipeline creates these by the million; no per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -8,6 +11,32 @@ class HTMLNode:
 
     def to_html(self):
         raise NotImplementedError
+
+    def iter_html(self):
+        # yields the same markup as to_html in chunks, walking the tree with an
+        # explicit stack so deep trees are neither recursed nor copied per level
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                if node.tag == None:
+                    raise ValueError("Parentnode must have tag")
+                yield node.open_tag()
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.to_html()
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
+
+    def open_tag(self):
+        props = self.props_to_html()
+        if props:
+            return f"<{self.tag} {props}>"
+        return f"<{self.tag}>"
     
     def props_to_html(self):
         prop_list = []
@@ -24,6 +53,8 @@ class HTMLNode:
     
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag, value, children=None, props=props)
 
@@ -33,32 +64,54 @@ class LeafNode(HTMLNode):
         if self.tag == None:
             return self.value
         else:
-            props = self.props_to_html()
-            if props: 
-                open_tag = f"<{self.tag} {props}>"
-            else:
-                open_tag = f"<{self.tag}>"
-            return f'{open_tag}{self.value}</{self.tag}>'
+            return f'{self.open_tag()}{self.value}</{self.tag}>'
         
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, value=None, children=children, props=props)
 
     def to_html(self):
-        if self.tag == None:
-            raise ValueError("Parentnode must have tag")
-            # elif self.children == None:
-            # raise ValueError("Parentnode must have children")
-        else:
-            child_html_strings = [] # Create a list
-            for child in self.children:
-                child_html_strings.append(child.to_html()) # Add each child's HTML to the list
-            html_string = "".join(child_html_strings)
-            props = self.props_to_html()
-            if props: 
-                open_tag = f"<{self.tag} {props}>"
-            else:
-                open_tag = f"<{self.tag}>"
-            
-            return f'{open_tag}{html_string}</{self.tag}>'
\ No newline at end of file
+        return "".join(self.iter_html())
+
+
+# original static path -> fingerprinted path, e.g. index.css -> index.0f1e2d3c4b5a.css;
+# empty unless the build fingerprints assets, see set_asset_paths
+asset_paths = {}
+# bumped by set_asset_paths, so caches of rebased HTML can tell maps apart
+asset_version = 0
+
+
+def set_asset_paths(paths):
+    global asset_paths, asset_version
+    asset_paths = paths
+    asset_version += 1
+
+
+def rebase_url(url, basepath):
+    # url starts with "/"
+    if not asset_paths:
+        return basepath + url[1:]
+    cut = len(url)
+    for mark in "?#":
+        index = url.find(mark)
+        if index != -1:
+            cut = min(cut, index)
+    path = url[1:cut]
+    return basepath + asset_paths.get(path, path) + url[cut:]
+
+
+def rebase_urls(node, basepath):
+    # point root-relative href/src props at basepath, e.g. /images/a.png -> /site/images/a.png
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.props:
+            for key in ("href", "src"):
+                url = node.props.get(key)
+                if url is not None and url.startswith("/"):
+                    node.props[key] = rebase_url(url, basepath)
+        if node.children:
+            stack.extend(node.children)
@@ -1,8 +1,21 @@
 from textnode import TextNode, TextType # type: ignore
-from htmlnode import LeafNode # type: ignore
+from htmlnode import LeafNode, ParentNode # type: ignore
 import re
 
+
+_image_re = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_link_re = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# links that are not the tail of an image, for searching rather than matching at a known "["
+_link_only_re = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_markup_re = re.compile(r"!\[|\[|\*\*|_|`")
+_delimiter_types = {"**": TextType.bold, "_": TextType.italic, "`": TextType.code}
+_nested_tags = {TextType.bold: "b", TextType.italic: "i", TextType.link: "a"}
+
+
 def text_node_to_html_node(text_node):
+    nested = _nested_html_node(text_node)
+    if nested is not None:
+        return nested
     if text_node.text_type == TextType.plain:
         new_htmlNode = LeafNode(value=text_node.text)
         return new_htmlNode
@@ -25,154 +38,137 @@ def text_node_to_html_node(text_node):
         raise Exception("Type is not supported")
 
 
+def _nested_html_node(text_node):
+    # bold, italic and link text may carry markup of its own, e.g. [**bold** text](url)
+    tag = _nested_tags.get(text_node.text_type)
+    if tag is None or _markup_re.search(text_node.text) is None:
+        return None
+    inner_nodes = text_to_textnodes(text_node.text)
+    if len(inner_nodes) == 1 and inner_nodes[0].text_type == TextType.plain:
+        return None
+    children = [text_node_to_html_node(node) for node in inner_nodes]
+    props = {"href": text_node.url} if text_node.text_type == TextType.link else None
+    return ParentNode(tag, children, props)
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
 
     for old_node in old_nodes:
-        if old_node.text_type == TextType.plain:
-            node_list = old_node.text.split(delimiter)
-            if len(node_list) %2 == 0:
-                raise Exception("Invalid markdown syntax: unmatched delimiter")
-            node_index = 0
-            while node_index < len(node_list):
-                if node_index % 2 == 0:
-                    if node_list[node_index] != "":
-                        newest_node = TextNode(node_list[node_index], TextType.plain)
-                        new_nodes.append(newest_node)
-
-                else:
-                    if node_list[node_index] != "":
-                        newest_node = TextNode(node_list[node_index], text_type)
-                        new_nodes.append(newest_node)
-                
-                node_index += 1
-
-        else:
+        if old_node.text_type != TextType.plain:
             new_nodes.append(old_node)
+            continue
+        if delimiter not in old_node.text:
+            if old_node.text != "":
+                new_nodes.append(old_node)
+            continue
+        node_list = old_node.text.split(delimiter)
+        if len(node_list) % 2 == 0:
+            raise Exception("Invalid markdown syntax: unmatched delimiter")
+        for node_index, part in enumerate(node_list):
+            if part != "":
+                new_nodes.append(TextNode(part, TextType.plain if node_index % 2 == 0 else text_type))
     return new_nodes
 
 
 def extract_markdown_images(text):
-    matches = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-    return matches
+    if "![" not in text:
+        return []
+    return [match.groups() for match in _image_re.finditer(text)]
 
 def extract_markdown_links(text):
-    matches = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-    return matches
+    if "[" not in text:
+        return []
+    return [match.groups() for match in _link_only_re.finditer(text)]
 
 def split_nodes_image(old_nodes):
-    new_nodes = []
-    for old_node in old_nodes:
-
-        # FIRST CHECK: Is this node NOT a plain text node?
-        if old_node.text_type is not TextType.plain:
-            # If it's not plain text, just add it to the new_nodes list (assuming its text is not empty)
-            if old_node.text != "": # This check is good
-                new_nodes.append(old_node)
-            # Then, you're done with this old_node, move to the next one in the loop
-            continue # This helps clarify flow
-
-        # ELSE: If we reach here, it means old_node.text_type *IS* TextType.plain
-        # NOW we apply the splitting logic for plain text nodes that might contain images.
-        if old_node.text == "": # Handle empty string for plain text nodes
-            continue # Skip to next old_node if text is empty
-
-        extracted_values = extract_markdown_images(old_node.text)
-
-        if not extracted_values: # Scenario 1: No images found in this plain text node
-            new_nodes.append(old_node) # Append the original plain text node as is
-            continue # Move to the next old_node in the main loop
-
-        # Scenario 2: Images ARE found! Proceed with complex splitting logic.
-        temp_nodes_for_this_node = []
-        current_text_to_process = old_node.text # Start with the full text
-
-        for alt_text, url in extracted_values:
-            image_markdown_delimiter = f"![{alt_text}]({url})"
-            parts = current_text_to_process.split(image_markdown_delimiter, 1)
-
-            if parts[0]:
-                temp_nodes_for_this_node.append(TextNode(parts[0], TextType.plain))
-
-            temp_nodes_for_this_node.append(TextNode(alt_text, TextType.image, url))
-
-            current_text_to_process = parts[1]
-
-        if current_text_to_process:
-            temp_nodes_for_this_node.append(TextNode(current_text_to_process, TextType.plain))
-
-        new_nodes.extend(temp_nodes_for_this_node)
-
-    return new_nodes
+    return _split_nodes_pattern(old_nodes, "![", _image_re, TextType.image)
 
 def split_nodes_link(old_nodes):
+    return _split_nodes_pattern(old_nodes, "[", _link_only_re, TextType.link)
+
+def _split_nodes_pattern(old_nodes, marker, pattern, text_type):
+    # cuts each plain node at the match spans, so every match is found once
+    # and the text between matches is sliced out by offset
     new_nodes = []
     for old_node in old_nodes:
-
-        # FIRST CHECK: Is this node NOT a plain text node?
-        if old_node.text_type is not TextType.plain:
-            # If it's not plain text, just add it to the new_nodes list (assuming its text is not empty)
-            if old_node.text != "": # This check is good
-                new_nodes.append(old_node)
-            # Then, you're done with this old_node, move to the next one in the loop
-            continue # This helps clarify flow
-
-        # ELSE: If we reach here, it means old_node.text_type *IS* TextType.plain
-        # NOW we apply the splitting logic for plain text nodes that might contain images.
-        if old_node.text == "": # Handle empty string for plain text nodes
-            continue # Skip to next old_node if text is empty
-
-        extracted_values = extract_markdown_links(old_node.text)
-
-        if not extracted_values: # Scenario 1: No images found in this plain text node
-            new_nodes.append(old_node) # Append the original plain text node as is
-            continue # Move to the next old_node in the main loop
-
-        # Scenario 2: Images ARE found! Proceed with complex splitting logic.
-        temp_nodes_for_this_node = []
-        current_text_to_process = old_node.text # Start with the full text
-
-        for link_text, url in extracted_values:
-            link_markdown_delimiter = f"[{link_text}]({url})"
-            parts = current_text_to_process.split(link_markdown_delimiter, 1)
-
-            if parts[0]:
-                temp_nodes_for_this_node.append(TextNode(parts[0], TextType.plain))
-
-            temp_nodes_for_this_node.append(TextNode(link_text, TextType.link, url))
-
-            current_text_to_process = parts[1]
-
-        if current_text_to_process:
-            temp_nodes_for_this_node.append(TextNode(current_text_to_process, TextType.plain))
-
-        new_nodes.extend(temp_nodes_for_this_node)
-
+        text = old_node.text
+        if text == "":
+            continue
+        if old_node.text_type is not TextType.plain or marker not in text:
+            new_nodes.append(old_node)
+            continue
+        pos = 0
+        for match in pattern.finditer(text):
+            if match.start() > pos:
+                new_nodes.append(TextNode(text[pos:match.start()], TextType.plain))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            pos = match.end()
+        if pos == 0:
+            new_nodes.append(old_node)
+        elif pos < len(text):
+            new_nodes.append(TextNode(text[pos:], TextType.plain))
     return new_nodes
 
 def text_to_textnodes(text):
-    orig_node = TextNode(text,TextType.plain)
-    textnodes_list = [orig_node]
-    simple_text_type = [TextType.bold, TextType.italic, TextType.code]
-    simple_text_delim = ["**", "_", "`"]
-    i = 0
-    # bold/italic/code
-    for text_type in simple_text_type:
-        temp_textnodes_list = []
-        for textnode in textnodes_list:
-            temp_textnodes_list.extend(split_nodes_delimiter([textnode], simple_text_delim[i], text_type))
-        i += 1
-        textnodes_list = (temp_textnodes_list)
-    
-    #link
-    temp_textnodes_list = []
-    for textnode in textnodes_list:
-        temp_textnodes_list.extend(split_nodes_link([textnode]))
-    textnodes_list = temp_textnodes_list
-    #image
-    temp_textnodes_list = []
-    for textnode in textnodes_list:
-        temp_textnodes_list.extend(split_nodes_image([textnode]))
-    textnodes_list = temp_textnodes_list
-
-    return textnodes_list
+    # one left-to-right scan: jump to the next markup character, try to close
+    # it, and emit the plain text in between. Unclosed markup stays literal.
+    if "[" not in text and "*" not in text and "_" not in text and "`" not in text:
+        return [TextNode(text, TextType.plain)] if text else []
+    nodes = []
+    plain_start = 0
+    pos = 0
+    # a delimiter with no closer after some point has none after any later point either
+    unclosed = set()
+    while True:
+        match = _markup_re.search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+        token = match.group(0)
+        node = None
+        end = -1
+        if token == "![":
+            found = _image_re.match(text, start)
+            if found:
+                node = TextNode(found.group(1), TextType.image, found.group(2))
+                end = found.end()
+        elif token == "[":
+            found = _link_re.match(text, start)
+            if found:
+                node = TextNode(found.group(1), TextType.link, found.group(2))
+                end = found.end()
+        elif token not in unclosed and _opens(text, start, token):
+            close = _find_closer(text, start + len(token), token)
+            if close == -1:
+                unclosed.add(token)
+            else:
+                node = TextNode(text[start + len(token):close], _delimiter_types[token])
+                end = close + len(token)
+
+        if end == -1:
+            pos = start + len(token)
+            continue
+        if start > plain_start:
+            nodes.append(TextNode(text[plain_start:start], TextType.plain))
+        # empty delimited sections like `` are dropped, as split_nodes_delimiter does
+        if node.text != "" or node.text_type in (TextType.link, TextType.image):
+            nodes.append(node)
+        plain_start = pos = end
+
+    if plain_start < len(text):
+        nodes.append(TextNode(text[plain_start:], TextType.plain))
+    return nodes
+
+
+def _opens(text, index, delimiter):
+    # snake_case words keep their underscores
+    return delimiter != "_" or index == 0 or not text[index - 1].isalnum()
+
+
+def _find_closer(text, index, delimiter):
+    close = text.find(delimiter, index)
+    if delimiter == "_":
+        while close != -1 and close + 1 < len(text) and text[close + 1].isalnum():
+            close = text.find(delimiter, close + 1)
+    return close
@@ -0,0 +1,152 @@
+import functools
+import mimetypes
+import os
+import posixpath
+import shutil
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from gencontent import render_page # type: ignore
+
+
+class LazySite:
+    # answers requests straight from content/ and static/: pages are rendered
+    # on first request and kept in an LRU bounded by max_bytes, each entry
+    # valid while its source and the template keep their mtimes
+    def __init__(self, content_dir, static_dir, template_path, basepath="/", max_bytes=64 * 2**20):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.basepath = basepath
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def resolve(self, url_path):
+        # ("page", source), ("static", file), ("redirect", url) or None, laid
+        # out as a build would write docs/: content/a/b.md is <basepath>a/b.html
+        if not url_path.startswith(self.basepath) and url_path + "/" != self.basepath:
+            return None
+        rel_path = posixpath.normpath(unquote(url_path[len(self.basepath):]) or ".")
+        if rel_path.startswith("..") or rel_path.startswith("/"):
+            return None
+        if rel_path == ".":
+            rel_path = ""
+        if url_path.endswith("/"):
+            rel_path = posixpath.join(rel_path, "index.html")
+        parts = [part for part in rel_path.split("/") if part]
+        if parts and parts[-1].endswith(".html"):
+            source = os.path.join(self.content_dir, *parts[:-1], parts[-1][: -len(".html")] + ".md")
+            if os.path.isfile(source):
+                return "page", source
+        static_path = os.path.join(self.static_dir, *parts)
+        if os.path.isfile(static_path):
+            return "static", static_path
+        # a directory without its trailing slash, as http.server redirects it
+        if not url_path.endswith("/") and (
+            os.path.isfile(os.path.join(self.content_dir, *parts, "index.md"))
+            or os.path.isfile(os.path.join(self.static_dir, *parts, "index.html"))
+        ):
+            return "redirect", url_path + "/"
+        return None
+
+    def page(self, source):
+        # the rendered page as bytes
+        stamp = (os.stat(source).st_mtime_ns, os.stat(self.template_path).st_mtime_ns)
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(source)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # rendered outside the lock, so one slow page does not hold up the rest
+        body = render_page(source, self.template_path, self.basepath).encode("utf-8")
+        with self.lock:
+            old = self.entries.pop(source, None)
+            if old is not None:
+                self.size -= len(old[1])
+            if len(body) <= self.max_bytes:
+                self.entries[source] = (stamp, body)
+                self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return body
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return f"{self.hits} hits, {self.misses} renders ({rate:.0%} hit rate), {len(self.entries)} pages cached in {self.size} bytes"
+
+
+class LazyRequestHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, site=None, **kwargs):
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        url_path = urlsplit(self.path).path
+        target = self.site.resolve(url_path)
+        if target is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        kind, path = target
+        if kind == "redirect":
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", path)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if kind == "page":
+            try:
+                body = self.site.page(path)
+            except Exception as e:
+                self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{path}: {e}")
+                return
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+        with open(path, "rb") as f:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+            if send_body:
+                shutil.copyfileobj(f, self.wfile)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_lazy_server(site, port, quiet=False):
+    handler = functools.partial(LazyRequestHandler, site=site)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    server.quiet = quiet
+    return server
+
+
+def start_lazy_server(site, port, quiet=False):
+    # serves on a background thread, for benchmarks and tests
+    server = make_lazy_server(site, port, quiet)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
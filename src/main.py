@@ -1,32 +1,361 @@
+import argparse
+import cProfile
 import os
+import pstats
 import shutil
 import sys
 
-from copystatic import copy_files_recursive 
-from gencontent import generate_pages_recursive
+import fileio
+from assets import asset_paths, fingerprint_static, write_asset_manifest
+from blocks import BlockCache
+from buildplan import plan_build
+from compress import precompress
+from copystatic import copy_files, sync_files_recursive
+from depgraph import DependencyGraph
+from htmlnode import set_asset_paths
+from gencontent import find_pages, generate_pages, generate_pages_incremental, record_pages, report_broken_links, set_block_cache, set_minify, set_profile
+from profiling import BuildProfile
+from shard import merge_shards, parse_shard, save_shard_meta, shard_dir, shard_pages
+from siteindex import write_site_indexes
+from manifest import load_manifest, new_manifest, save_manifest
 
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
 template_path = "./template.html"
+manifest_path = "./.build-manifest.json"
+block_cache_path = "./.block-cache.json"
+precompress_state_path = "./.precompress.json"
+dir_path_shards = "./docs-shards"
 default_basepath = "/"
+default_port = 8888
 
-def main():
-    basepath = default_basepath
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default=default_basepath)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep ./docs and only regenerate pages whose inputs changed",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render pages on N worker processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--link",
+        action="store_true",
+        help="hard link static files into ./docs instead of copying them",
+    )
+    parser.add_argument(
+        "--block-cache",
+        action="store_true",
+        help=f"keep rendered blocks in {block_cache_path} between builds",
+    )
+    parser.add_argument(
+        "--block-cache-mb",
+        type=int,
+        default=64,
+        help="memory the block cache may use in MiB, counting keys, string headers and bookkeeping as well as the HTML (0 disables it)",
+    )
+    parser.add_argument(
+        "--io",
+        choices=fileio.backends,
+        default="buffered",
+        help="mmap reads sources through memory maps and copies static files with copy_file_range/sendfile",
+    )
+    parser.add_argument(
+        "--io-depth",
+        type=int,
+        default=0,
+        metavar="N",
+        help="overlap reads, rendering and writes on an asyncio pipeline with N reads and N writes in flight (single process builds)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-profile.json",
+        metavar="REPORT",
+        help="time every page stage and write a JSON report (default build-profile.json)",
+    )
+    parser.add_argument("--profile-top", type=int, default=10, help="how many of the slowest pages to list")
+    parser.add_argument(
+        "--cprofile",
+        metavar="STATS",
+        help="run the build under cProfile and dump the stats to this file (main process only)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files to content-hashed names and point pages at those, so they can be cached forever",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="drop insignificant whitespace from pages as they are written (<pre> content is kept)",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz (and .br, if the brotli module is installed) next to every compressible file in ./docs, on --jobs workers",
+    )
+    parser.add_argument(
+        "--site-url",
+        default="",
+        help="scheme and host put in front of page URLs in sitemap.xml and the blog feed, e.g. https://example.com; both need absolute URLs, so neither is written without it",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="i/N",
+        help=f"build only the pages in shard i of N into {dir_path_shards}/i-of-N; combine them with 'merge N'",
+    )
+    args = parser.parse_args(argv)
+    basepath = args.basepath
+    jobs = args.jobs or os.cpu_count() or 1
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.incremental:
+            parser.error("--shard builds are always full builds")
+    if args.io_depth > 0 and (jobs > 1 or args.profile):
+        parser.error("--io-depth only applies to single process builds without --profile")
+    fileio.set_backend(args.io)
+    set_minify(args.minify)
 
-    
+    profile = BuildProfile() if args.profile else None
+    set_profile(profile)
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler is not None:
+        profiler.enable()
+
+    cache = None
+    if args.block_cache_mb > 0:
+        cache = BlockCache(args.block_cache_mb * 2**20)
+        if args.block_cache:
+            cache.load(block_cache_path)
+    set_block_cache(cache)
+
+    if shard is not None:
+        build_shard(basepath, jobs, shard, args.io_depth, args.fingerprint, args.minify)
+    elif args.incremental:
+        build_incremental(basepath, jobs, args.link, args.io_depth, args.site_url, args.fingerprint)
+    else:
+        build_full(basepath, jobs, args.link, args.io_depth, args.site_url, args.fingerprint)
+    if args.precompress and shard is None:
+        print("Precompressing docs directory...")
+        precompress(dir_path_public, jobs, precompress_state_path)
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        print(f"cProfile stats written to {args.cprofile}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+    if profile is not None:
+        profile.write_report(args.profile, args.profile_top)
+    if cache is not None:
+        print(f"Block cache: {cache.stats()}")
+        if args.block_cache:
+            cache.save(block_cache_path)
+
+
+def watch(argv=None):
+    from devserver import ReloadNotifier, start_server
+    from watcher import SiteWatcher
+
+    parser = argparse.ArgumentParser(description="Rebuild ./docs on every change and serve it with live reload")
+    parser.add_argument("basepath", nargs="?", default=default_basepath)
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between polls")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="render pages on N worker processes (0 uses every CPU core)")
+    parser.add_argument("--fingerprint", action="store_true", help="copy static files to content-hashed names, as a build does")
+    parser.add_argument("--minify", action="store_true", help="minify pages as they are written")
+    parser.add_argument("--site-url", default="", help="scheme and host for the sitemap and blog feed")
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+    set_minify(args.minify)
+    # rendered blocks stay in memory between rebuilds
+    set_block_cache(BlockCache())
+
+    # the manifest stays in memory between rebuilds and is saved when the
+    # session ends; the copy on disk goes now, so a session that is killed
+    # leaves none behind to disagree with docs/
+    manifest = load_manifest(manifest_path)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    def rebuild(changed=None):
+        nonlocal manifest
+        manifest = build_incremental(args.basepath, jobs, site_url=args.site_url, fingerprint=args.fingerprint, manifest=manifest, changed=changed)
+
+    rebuild()
+    watcher = SiteWatcher(dir_path_content, dir_path_static, template_path, rebuild)
+    notifier = ReloadNotifier()
+    server = start_server(dir_path_public, args.port, notifier)
+    print(f"Serving {dir_path_public} on http://localhost:{args.port}/ and watching for changes...")
+    try:
+        watcher.watch(lambda sources: notifier.notify(), args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        save_manifest(manifest, manifest_path)
+
+
+def serve(argv=None):
+    from lazyserver import LazySite, make_lazy_server
+
+    parser = argparse.ArgumentParser(description="Serve the site straight from ./content and ./static, rendering pages on request")
+    parser.add_argument("basepath", nargs="?", default=default_basepath)
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--cache-mb", type=int, default=64, help="size limit of the rendered page cache in MiB")
+    parser.add_argument("--minify", action="store_true", help="minify pages as they are rendered")
+    args = parser.parse_args(argv)
+
+    set_minify(args.minify)
+    site = LazySite(dir_path_content, dir_path_static, template_path, args.basepath, args.cache_mb * 2**20)
+    server = make_lazy_server(site, args.port)
+    print(f"Serving {dir_path_content} and {dir_path_static} on http://localhost:{args.port}{args.basepath}, rendering pages on request...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Page cache: {site.stats()}")
+
+
+def merge(argv=None):
+    parser = argparse.ArgumentParser(description=f"Combine the shards in {dir_path_shards} and the static files into ./docs")
+    parser.add_argument("shards", type=int, help="the N the shards were built with")
+    parser.add_argument(
+        "--link",
+        action="store_true",
+        help="hard link static files into ./docs instead of copying them",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files to content-hashed names; the shards must have been built with --fingerprint too",
+    )
+    parser.add_argument(
+        "--site-url",
+        default="",
+        help="scheme and host for the URLs in sitemap.xml and the blog feed, as for a full build",
+    )
+    args = parser.parse_args(argv)
+    # a merged docs/ was not produced by the last incremental build
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    try:
+        merge_shards(dir_path_shards, args.shards, dir_path_static, dir_path_public, args.link, args.fingerprint, args.site_url)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def build_shard(basepath, jobs, shard, io_depth=0, fingerprint=False, minify=False):
+    # minify is only recorded for merge to compare; set_minify applies it
+    dest_dir_path = shard_dir(dir_path_shards, *shard)
+    print(f"Deleting {dest_dir_path}...")
+    if os.path.exists(dest_dir_path):
+        shutil.rmtree(dest_dir_path)
+
+    if fingerprint:
+        # the names only; merge copies the files
+        state, _ = fingerprint_static(dir_path_static, None, {})
+        set_asset_paths(asset_paths(state))
+
+    print(f"Generating content for shard {shard[0]}/{shard[1]}...")
+    pages = shard_pages(find_pages(dir_path_content, dest_dir_path), dir_path_content, *shard)
+    os.makedirs(dest_dir_path)
+    infos = generate_pages(pages, template_path, basepath, jobs, io_depth)
+    save_shard_meta(dir_path_shards, *shard, basepath, pages, infos, dir_path_content, fingerprint, minify)
+    print(f"{len(pages)} pages in shard {shard[0]}/{shard[1]}")
+
+
+def build_full(basepath, jobs, link=False, io_depth=0, site_url="", fingerprint=False):
     print("Deleting docs directory...")
     if os.path.exists(dir_path_public):
         shutil.rmtree(dir_path_public)
+    # a full build invalidates whatever the last incremental build recorded
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # one walk of content/ and static/ finds every page, file and output directory
+    plan = plan_build(dir_path_content, dir_path_static, dir_path_public)
+    plan.make_dirs()
 
     print("Copying static files to docs directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+    if fingerprint:
+        state, _ = fingerprint_static(dir_path_static, dir_path_public, {}, link, plan.static)
+        set_asset_paths(asset_paths(state))
+        write_asset_manifest(dir_path_public, asset_paths(state))
+    else:
+        copy_files(dir_path_static, dir_path_public, plan.static, link)
 
     print("Generating content...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public, basepath)
+    pages = plan.pages()
+    infos = generate_pages(pages, template_path, basepath, jobs, io_depth)
+    static_files = set(plan.static)
+    graph = DependencyGraph()
+    meta = {}
+    record_pages(graph, pages, infos, dir_path_content, dir_path_public, meta)
+    report_broken_links(graph, static_files)
+    write_site_indexes(dir_path_public, meta, basepath, site_url)
+
+
+def build_incremental(basepath, jobs, link=False, io_depth=0, site_url="", fingerprint=False, manifest=None, changed=None):
+    # a watch session passes its in-memory manifest and the paths its watcher
+    # saw change, and saves the manifest itself when it ends; otherwise the
+    # manifest is loaded and saved here and every source is checked
+    session = manifest is not None
+    if not session:
+        manifest = load_manifest(manifest_path)
+    if manifest["fingerprint"] != fingerprint:
+        # static files are laid out differently with and without --fingerprint,
+        # and a new manifest does not know what docs/ holds, so start clean
+        print("Deleting docs directory...")
+        if os.path.exists(dir_path_public):
+            shutil.rmtree(dir_path_public)
+        manifest = new_manifest()
+        manifest["fingerprint"] = fingerprint
+        # a new manifest knows no pages, so every source is checked
+        changed = None
+
+    plan = plan_build(dir_path_content, dir_path_static, dir_path_public)
+    plan.make_dirs()
+
+    print("Syncing static files to docs directory...")
+    if fingerprint:
+        manifest["static"], static_changed = fingerprint_static(dir_path_static, dir_path_public, manifest["static"], link, plan.static)
+        set_asset_paths(asset_paths(manifest["static"]))
+        write_asset_manifest(dir_path_public, asset_paths(manifest["static"]))
+    else:
+        static_changed = sync_files_recursive(dir_path_static, dir_path_public, manifest["static"], link, plan.static)
 
+    print("Generating changed content...")
+    # a session names the changed sources and does not need every page
+    pages = plan.pages() if changed is None else None
+    meta_changed = generate_pages_incremental(dir_path_content, template_path, dir_path_public, basepath, manifest, jobs, io_depth, static_changed, pages, changed)
+    # within a session site_url stays put, so the indexes only follow the pages
+    if meta_changed or changed is None:
+        write_site_indexes(dir_path_public, manifest["meta"], basepath, site_url)
+    if not session:
+        save_manifest(manifest, manifest_path)
+    return manifest
 
-main()
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["watch"]:
+        watch(sys.argv[2:])
+    elif sys.argv[1:2] == ["merge"]:
+        merge(sys.argv[2:])
+    elif sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+
+from depgraph import DependencyGraph # type: ignore
+
+
+MANIFEST_VERSION = 8
+
+
+def new_manifest():
+    return {
+        "version": MANIFEST_VERSION,
+        "template": None,
+        "basepath": None,
+        "minify": None,
+        "pages": {},
+        "static": {},
+        # whether static files were fingerprinted; see assets.fingerprint_static
+        "fingerprint": None,
+        # a DependencyGraph in memory, its to_dict() on disk
+        "graph": DependencyGraph(),
+        "meta": {},
+    }
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return new_manifest()
+    with open(path, "r") as f:
+        try:
+            manifest = json.load(f)
+        except ValueError:
+            return new_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+    manifest["graph"] = DependencyGraph.from_dict(manifest["graph"])
+    return manifest
+
+
+def save_manifest(manifest, path):
+    # write to a temp file first so an interrupted build never leaves a half-written manifest
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(dict(manifest, graph=manifest["graph"].to_dict()), f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,126 @@
+import re
+
+
+# whitespace next to these tags never renders, so it can go entirely;
+# anywhere else a run of whitespace still shows as one space
+block_tags = {
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base", "script", "style",
+    "article", "aside", "section", "header", "footer", "nav", "main", "div", "p",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "blockquote", "pre", "hr",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "figure", "figcaption",
+}
+# content of these is passed through untouched
+raw_tags = {"pre", "script", "style", "textarea"}
+# HTML whitespace only; a non-breaking space is content
+_space_re = re.compile(r"[ \t\n\r\f]+")
+_tag_name_re = re.compile(r"</?([!\w-]+)")
+
+
+class Minifier:
+    # a streaming minifier: feed it chunks of HTML in order, in any sizes.
+    # Tags pass through as they are, text has its whitespace collapsed and
+    # raw elements like <pre> are copied byte for byte.
+    def __init__(self):
+        self.tag = None
+        self.raw_end = None
+        self.pending = ""
+        self.space = False
+        self.after_block = True
+
+    def feed(self, chunk):
+        out = []
+        text = self.pending + chunk
+        self.pending = ""
+        pos = 0
+        while pos < len(text):
+            if self.raw_end is not None:
+                end = text.find(self.raw_end, pos)
+                if end == -1:
+                    # keep enough back to spot an end tag split across chunks
+                    keep = max(pos, len(text) - len(self.raw_end) + 1)
+                    out.append(text[pos:keep])
+                    self.pending = text[keep:]
+                    break
+                out.append(text[pos:end])
+                self.raw_end = None
+                self.tag = ""
+                pos = end
+            elif self.tag is not None:
+                # the tag so far plus this chunk; tags are short, comments rare
+                tag = self.tag + text[pos:]
+                if len(tag) < 4 and "<!--".startswith(tag):
+                    self.tag = tag
+                    break
+                closer = "-->" if tag.startswith("<!--") else ">"
+                end = tag.find(closer, 4 if closer == "-->" else 1)
+                if end == -1:
+                    self.tag = tag
+                    break
+                end += len(closer)
+                pos = len(text) - (len(tag) - end)
+                self.tag = tag[:end]
+                out.append(self.end_tag())
+            else:
+                end = text.find("<", pos)
+                if end == -1:
+                    out.append(self.text(text[pos:]))
+                    break
+                out.append(self.text(text[pos:end]))
+                # the tag's name decides what happens to whitespace before it
+                self.tag = ""
+                pos = end
+        return "".join(out)
+
+    def text(self, text):
+        if not text:
+            return ""
+        collapsed = _space_re.sub(" ", text)
+        if collapsed == " ":
+            self.space = True
+            return ""
+        out = ""
+        if collapsed[0] == " ":
+            self.space = True
+            collapsed = collapsed[1:]
+        if self.space and not self.after_block:
+            out = " "
+        self.space = collapsed[-1] == " "
+        self.after_block = False
+        return out + collapsed.rstrip(" ")
+
+    def end_tag(self):
+        tag, self.tag = self.tag, None
+        if tag.startswith("<!--"):
+            # comments leave the whitespace around them as it was
+            return tag
+        match = _tag_name_re.match(tag)
+        name = match.group(1).lower() if match else ""
+        is_block = name in block_tags
+        out = " " if self.space and not self.after_block and not is_block else ""
+        self.space = False
+        self.after_block = is_block
+        if name in raw_tags and not tag.startswith("</") and not tag.endswith("/>"):
+            self.raw_end = f"</{name}"
+        return out + tag
+
+    def close(self):
+        # whatever is still buffered: an unfinished tag or raw element
+        out = (self.tag or "") + self.pending
+        self.tag = None
+        self.pending = ""
+        return out
+
+
+def minify_chunks(chunks):
+    minifier = Minifier()
+    for chunk in chunks:
+        out = minifier.feed(chunk)
+        if out:
+            yield out
+    out = minifier.close()
+    if out:
+        yield out
+
+
+def minify(html):
+    return "".join(minify_chunks([html]))
@@ -0,0 +1,53 @@
+import re
+
+from blocks import BlockType # type: ignore
+from inline import extract_markdown_images, extract_markdown_links # type: ignore
+
+
+_image_re = re.compile(r"!\[[^\[\]]*\]\([^\(\)]*\)")
+_link_re = re.compile(r"\[([^\[\]]*)\]\([^\(\)]*\)")
+_underscore_re = re.compile(r"(?<!\w)_|_(?!\w)")
+
+
+class PageInfo:
+    # what the render pass learns about a page besides its HTML, filled in
+    # block by block through the visit hook of markdown_to_html_node
+    __slots__ = ("title", "summary", "links", "images")
+
+    def __init__(self):
+        self.title = None
+        self.summary = None
+        self.links = []
+        self.images = []
+
+    def add_block(self, block):
+        # code is shown, not followed
+        if block.block_type == BlockType.code:
+            return
+        text = block.text
+        # the first paragraph with words of its own, not a row of navigation links
+        if self.summary is None and block.block_type == BlockType.paragraph and _link_re.sub("", _image_re.sub("", text)).strip():
+            self.summary = plain_text(text)
+        if "[" not in text:
+            return
+        self.images.extend(url for _, url in extract_markdown_images(text))
+        self.links.extend(url for _, url in extract_markdown_links(text))
+
+    def to_dict(self, source):
+        # what the site indexes need, kept in the manifest between builds
+        return {
+            "source": source,
+            "title": self.title,
+            "summary": self.summary or "",
+            "links": self.links,
+            "images": self.images,
+        }
+
+
+def plain_text(markdown):
+    # the words of a paragraph without its markup, for summaries; the block
+    # was already classified, so this is a few substitutions, not a parse
+    text = _image_re.sub("", markdown)
+    text = _link_re.sub(r"\1", text)
+    text = _underscore_re.sub("", text.replace("**", "").replace("`", ""))
+    return " ".join(text.split())
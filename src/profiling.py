@@ -0,0 +1,75 @@
+import json
+import time
+
+
+stages = ("read", "block_parse", "inline_parse", "to_html", "template", "write", "stream")
+
+
+class PageProfile:
+    def __init__(self, from_path):
+        self.from_path = from_path
+        self.stages = {}
+        self.nodes = 0
+
+    def time(self, stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+        return result
+
+    def total(self):
+        return sum(self.stages.values())
+
+    def to_dict(self):
+        return {
+            "path": self.from_path,
+            "seconds": self.total(),
+            "stages": self.stages,
+            "nodes": self.nodes,
+        }
+
+
+class BuildProfile:
+    def __init__(self):
+        self.pages = []
+
+    def add(self, page):
+        # pages rendered in worker processes arrive as dicts
+        if isinstance(page, PageProfile):
+            page = page.to_dict()
+        self.pages.append(page)
+
+    def write_report(self, path, top=10):
+        totals = {}
+        for page in self.pages:
+            for stage, seconds in page["stages"].items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        slowest = sorted(self.pages, key=lambda page: page["seconds"], reverse=True)
+        report = {
+            "pages": len(self.pages),
+            "seconds": sum(page["seconds"] for page in self.pages),
+            "nodes": sum(page["nodes"] for page in self.pages),
+            "stages": totals,
+            "slowest": [page["path"] for page in slowest[:top]],
+            "per_page": slowest,
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+
+        print(f"Profile of {len(self.pages)} pages written to {path}")
+        print("  " + "  ".join(f"{stage} {totals[stage] * 1000:.1f} ms" for stage in stages if stage in totals))
+        print(f"Slowest {min(top, len(slowest))} pages:")
+        for page in slowest[:top]:
+            parts = "  ".join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in page["stages"].items())
+            print(f"  {page['seconds'] * 1000:9.1f} ms {page['nodes']:8} nodes  {page['path']}  ({parts})")
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
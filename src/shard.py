@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import shutil
+
+from assets import asset_paths, fingerprint_static, write_asset_manifest # type: ignore
+from copystatic import copy_files_recursive # type: ignore
+from depgraph import as_posix # type: ignore
+from siteindex import write_site_indexes # type: ignore
+
+
+def parse_shard(spec):
+    # "i/N" with 1 <= i <= N
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {spec} is out of range")
+    return index, count
+
+
+def shard_of(rel_path, count):
+    # hashes the path with "/" separators, so every machine and every run
+    # puts a page in the same shard; 1-based like --shard
+    key = rel_path.replace(os.sep, "/").encode("utf-8")
+    return int.from_bytes(hashlib.sha1(key).digest()[:8], "big") % count + 1
+
+
+def shard_pages(pages, dir_path_content, index, count):
+    return [
+        (from_path, dest_path)
+        for from_path, dest_path in pages
+        if shard_of(os.path.relpath(from_path, dir_path_content), count) == index
+    ]
+
+
+# build settings recorded with every shard; a merge of shards that disagree
+# on one would mix pages from different builds
+shard_settings = ("basepath", "fingerprint", "minify")
+
+
+def shard_dir(shards_dir_path, index, count):
+    return os.path.join(shards_dir_path, f"{index}-of-{count}")
+
+
+def shard_meta_path(shards_dir_path, index, count):
+    # beside the shard directory, so it is not merged into docs/ as an output
+    return shard_dir(shards_dir_path, index, count) + ".meta.json"
+
+
+def save_shard_meta(shards_dir_path, index, count, basepath, pages, infos, dir_path_content, fingerprint=False, minify=False):
+    # the site index data of the shard's pages, for merge to write the
+    # sitemap, feed and search index a full build would, and the settings
+    # that must agree across shards
+    dest_dir_path = shard_dir(shards_dir_path, index, count)
+    meta = {}
+    for from_path, dest_path in pages:
+        output = as_posix(os.path.relpath(dest_path, dest_dir_path))
+        meta[output] = infos[from_path].to_dict(as_posix(os.path.relpath(from_path, dir_path_content)))
+    with open(shard_meta_path(shards_dir_path, index, count), "w") as f:
+        json.dump({"basepath": basepath, "fingerprint": fingerprint, "minify": minify, "meta": meta}, f)
+
+
+def load_shard_meta(shards_dir_path, count):
+    # ({setting: value} the shards agree on, meta of every page) from all the shards
+    values = {setting: set() for setting in shard_settings}
+    meta = {}
+    for index in range(1, count + 1):
+        path = shard_meta_path(shards_dir_path, index, count)
+        if not os.path.exists(path):
+            raise ValueError(f"shard {index}/{count} has no page metadata: {path} is missing")
+        with open(path) as f:
+            saved = json.load(f)
+        for setting in shard_settings:
+            values[setting].add(saved.get(setting))
+        meta.update(saved["meta"])
+    for setting, found in values.items():
+        if len(found) > 1:
+            raise ValueError(f"shards were built with different {setting} settings: {', '.join(sorted(map(str, found)))}")
+    return {setting: found.pop() for setting, found in values.items()}, meta
+
+
+def find_shard_outputs(shards_dir_path, count):
+    # relative output path -> the shard directories that contain it
+    outputs = {}
+    for index in range(1, count + 1):
+        dir_path = shard_dir(shards_dir_path, index, count)
+        if not os.path.isdir(dir_path):
+            raise ValueError(f"shard {index}/{count} has not been built: {dir_path} is missing")
+        for root, _, filenames in os.walk(dir_path):
+            for filename in filenames:
+                rel_path = os.path.relpath(os.path.join(root, filename), dir_path)
+                outputs.setdefault(rel_path, []).append(dir_path)
+    return outputs
+
+
+def merge_shards(shards_dir_path, count, dir_path_static, dest_dir_path, link=False, fingerprint=False, site_url=""):
+    # every output is checked before anything is touched, so a bad set of
+    # shards leaves the previous docs/ in place
+    outputs = find_shard_outputs(shards_dir_path, count)
+    conflicts = sorted(rel_path for rel_path, dirs in outputs.items() if len(dirs) > 1)
+    if conflicts:
+        listed = ", ".join(f"{rel_path} ({' and '.join(outputs[rel_path])})" for rel_path in conflicts[:5])
+        raise ValueError(f"{len(conflicts)} outputs were written by more than one shard: {listed}")
+    settings, meta = load_shard_meta(shards_dir_path, count)
+    if settings["fingerprint"] != fingerprint:
+        flag = "with" if settings["fingerprint"] else "without"
+        raise ValueError(f"shards were built {flag} --fingerprint; merge them the same way")
+
+    if os.path.exists(dest_dir_path):
+        shutil.rmtree(dest_dir_path)
+    if fingerprint:
+        os.makedirs(dest_dir_path)
+        state, _ = fingerprint_static(dir_path_static, dest_dir_path, {}, link)
+        write_asset_manifest(dest_dir_path, asset_paths(state))
+    else:
+        copy_files_recursive(dir_path_static, dest_dir_path, link)
+    # shard outputs are moved, not copied; pages win over static files, as in a normal build
+    for rel_path, (dir_path,) in sorted(outputs.items()):
+        from_path = os.path.join(dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        print(f" * {from_path} -> {dest_path}")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.move(from_path, dest_path)
+    # only the shards merged here; other shard counts may still be building
+    for index in range(1, count + 1):
+        shutil.rmtree(shard_dir(shards_dir_path, index, count))
+        os.remove(shard_meta_path(shards_dir_path, index, count))
+    if not os.listdir(shards_dir_path):
+        os.rmdir(shards_dir_path)
+    print(f"Merged {len(outputs)} outputs from {count} shards")
+    write_site_indexes(dest_dir_path, meta, settings["basepath"], site_url)
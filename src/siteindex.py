@@ -0,0 +1,93 @@
+import json
+import os
+from xml.sax.saxutils import escape
+
+
+sitemap_name = "sitemap.xml"
+feed_name = "blog/feed.xml"
+search_index_name = "search-index.json"
+# sources under this directory of content/ go in the feed
+feed_dir = "blog/"
+
+
+def page_url(output, basepath, site_url=""):
+    # docs/blog/tom/index.html is served as <basepath>blog/tom/
+    path = output[: -len("index.html")] if output == "index.html" or output.endswith("/index.html") else output
+    return site_url.rstrip("/") + basepath + path
+
+
+def write_site_indexes(dest_dir_path, meta, basepath, site_url=""):
+    # meta maps each output, relative to dest_dir_path, to PageInfo.to_dict();
+    # every artifact is written in one pass over it
+    outputs = sorted(meta)
+    posts = [output for output in outputs if meta[output]["source"].startswith(feed_dir)]
+    write_search_index(os.path.join(dest_dir_path, search_index_name), outputs, meta, basepath)
+    if not site_url:
+        # sitemaps and RSS only allow absolute URLs; drop any from an earlier build
+        remove_index(dest_dir_path, sitemap_name)
+        remove_index(dest_dir_path, feed_name)
+        print(f"Indexed {len(outputs)} pages; no sitemap or feed without --site-url")
+        return
+    write_sitemap(os.path.join(dest_dir_path, sitemap_name), outputs, basepath, site_url)
+    if posts:
+        write_feed(os.path.join(dest_dir_path, feed_name), posts, meta, basepath, site_url)
+    else:
+        # the last post is gone; an old feed would still list it
+        remove_index(dest_dir_path, feed_name)
+    print(f"Indexed {len(outputs)} pages ({len(posts)} in the feed)")
+
+
+def remove_index(dest_dir_path, name):
+    path = os.path.join(dest_dir_path, name)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def write_sitemap(path, outputs, basepath, site_url):
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        f.writelines(f"<url><loc>{escape(page_url(output, basepath, site_url))}</loc></url>\n" for output in outputs)
+        f.write("</urlset>\n")
+
+
+def write_feed(path, posts, meta, basepath, site_url):
+    home = meta.get("index.html")
+    title = home["title"] if home else "Blog"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<rss version="2.0">\n<channel>\n')
+        f.write(f"<title>{escape(title)}</title>\n")
+        f.write(f"<link>{escape(page_url(feed_dir, basepath, site_url))}</link>\n")
+        f.write(f"<description>{escape(title)}</description>\n")
+        for output in posts:
+            page = meta[output]
+            url = escape(page_url(output, basepath, site_url))
+            f.write(
+                f"<item><title>{escape(page['title'])}</title><link>{url}</link><guid>{url}</guid>"
+                f"<description>{escape(page['summary'])}</description></item>\n"
+            )
+        f.write("</channel>\n</rss>\n")
+
+
+def write_search_index(path, outputs, meta, basepath):
+    pages = (
+        {
+            "url": page_url(output, basepath),
+            "title": meta[output]["title"],
+            "summary": meta[output]["summary"],
+            "links": meta[output]["links"],
+            "images": meta[output]["images"],
+        }
+        for output in outputs
+    )
+    with open(path, "w") as f:
+        # one page at a time, so the index is never built as one string;
+        # json.dumps per page runs on the C encoder, json.dump does not
+        f.write("[")
+        for index, page in enumerate(pages):
+            if index:
+                f.write(",\n")
+            f.write(json.dumps(page))
+        f.write("]\n")
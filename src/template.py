@@ -0,0 +1,81 @@
+import os
+import re
+
+import htmlnode # type: ignore
+
+
+_placeholder_re = re.compile(r"\{\{ (\w+) \}\}")
+_url_attr_re = re.compile(r'(href|src)="(/[^"]*)"')
+_template_cache = {}
+
+
+class Template:
+    def __init__(self, text, basepath="/"):
+        # the basepath rewrite only has to happen once, on the template itself
+        text = rebase_text(text, basepath)
+        # literals live at even indexes of parts, placeholders at odd ones
+        self.parts = []
+        self.slots = []
+        pos = 0
+        for match in _placeholder_re.finditer(text):
+            self.parts.append(text[pos:match.start()])
+            self.slots.append((len(self.parts), match.group(1)))
+            self.parts.append(match.group(0))
+            pos = match.end()
+        self.parts.append(text[pos:])
+
+    def render(self, values):
+        parts = list(self.parts)
+        for index, name in self.slots:
+            if name in values:
+                parts[index] = values[name]
+        return "".join(parts)
+
+    def iter_chunks(self, values):
+        # like render, but values may also be HTML nodes or iterables of chunks,
+        # which are streamed instead of serialized up front
+        slot_names = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            if index not in slot_names or slot_names[index] not in values:
+                yield part
+                continue
+            value = values[slot_names[index]]
+            if isinstance(value, str):
+                yield value
+            elif hasattr(value, "iter_html"):
+                yield from value.iter_html()
+            else:
+                yield from value
+
+    def write(self, fp, values):
+        fp.writelines(self.iter_chunks(values))
+
+    def __repr__(self):
+        return f"Template({self.parts})"
+
+
+def load_template(template_path, basepath):
+    # compiled once per process; the mtime check lets long-running builds pick up edits
+    mtime = os.stat(template_path).st_mtime_ns
+    key = (template_path, basepath, htmlnode.asset_version)
+    cached = _template_cache.get(key)
+    if cached is None or cached[0] != mtime:
+        with open(template_path, "r") as f:
+            cached = (mtime, Template(f.read(), basepath))
+        _template_cache[key] = cached
+    return cached[1]
+
+
+def rebase_text(text, basepath):
+    if htmlnode.asset_paths:
+        return _url_attr_re.sub(lambda match: f'{match.group(1)}="{htmlnode.rebase_url(match.group(2), basepath)}"', text)
+    text = text.replace('href="/', 'href="' + basepath)
+    text = text.replace('src="/', 'src="' + basepath)
+    return text
+
+
+def template_assets(template_path):
+    # the root-relative paths the template links to, without query or fragment
+    with open(template_path, "r") as f:
+        text = f.read()
+    return {re.split(r"[?#]", url, 1)[0][1:] for _, url in _url_attr_re.findall(text)}
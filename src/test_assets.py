@@ -0,0 +1,120 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import htmlnode # type: ignore
+import main # type: ignore
+from assets import fingerprint_re, fingerprint_static, hashed_name # type: ignore
+from blocks import block_key, markdown_to_html_node # type: ignore
+from template import Template # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestFingerprintStatic(ScratchDir, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def fingerprint(self, previous):
+        with redirect_stdout(StringIO()):
+            return fingerprint_static(self.static, self.docs, previous, False)
+
+    def test_hashed_name(self):
+        name = hashed_name("images/a.png", "0123456789abcdef")
+        self.assertEqual(name, "images/a.0123456789ab.png")
+        self.assertTrue(fingerprint_re.search("/" + name))
+        self.assertFalse(fingerprint_re.search("/images/a.png"))
+
+    def test_copies_and_tracks_changes(self):
+        state, changed = self.fingerprint({})
+        self.assertEqual(sorted(changed), ["images/a.png", "index.css"])
+        css = state["index.css"][2]
+        self.assertTrue(os.path.exists(os.path.join(self.docs, css)))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+
+        state, changed = self.fingerprint(state)
+        self.assertEqual(changed, [])
+
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        old_png = state["images/a.png"][2]
+        state, changed = self.fingerprint(state)
+        self.assertEqual(sorted(changed), ["images/a.png", "index.css"])
+        self.assertNotEqual(state["index.css"][2], css)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, css)))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, old_png)))
+
+
+    def test_repairs_truncated_copy(self):
+        state, _ = self.fingerprint({})
+        css = os.path.join(self.docs, state["index.css"][2])
+        # what an interrupted copy leaves behind
+        self.write(css, "bo")
+        self.fingerprint({})
+        with open(css) as f:
+            self.assertEqual(f.read(), "body {}")
+        self.assertEqual(sorted(os.listdir(self.docs)), ["images", os.path.basename(css)])
+
+
+class TestAssetRewrite(unittest.TestCase):
+    def setUp(self):
+        htmlnode.set_asset_paths({"index.css": "index.abc.css", "images/a.png": "images/a.def.png"})
+
+    def tearDown(self):
+        htmlnode.set_asset_paths({})
+
+    def test_pages(self):
+        node = markdown_to_html_node("![a](/images/a.png) [b](/images/a.png#x) [c](/blog)", "/site/")
+        self.assertEqual(
+            node.to_html(),
+            '<div><p><img src="/site/images/a.def.png" alt="a"></img> <a href="/site/images/a.def.png#x">b</a> <a href="/site/blog">c</a></p></div>',
+        )
+
+    def test_template(self):
+        template = Template('<link href="/index.css?v=1"><a href="/">home</a>', "/site/")
+        self.assertEqual(template.render({}), '<link href="/site/index.abc.css?v=1"><a href="/site/">home</a>')
+
+    def test_block_key_follows_asset_names(self):
+        key = block_key("![a](/images/a.png)", "/")
+        self.assertEqual(key, block_key("![a](/images/a.png)", "/"))
+        htmlnode.set_asset_paths({"images/a.png": "images/a.123.png"})
+        self.assertNotEqual(key, block_key("![a](/images/a.png)", "/"))
+
+
+class TestFingerprintIncremental(ScratchDir, unittest.TestCase):
+    chdir = True
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs("content")
+        os.makedirs(os.path.join("static", "images"))
+        self.write("template.html", "{{ Content }}")
+        self.write(os.path.join("content", "new.md"), "# New\n\n![x](/images/new.png)")
+
+    def tearDown(self):
+        htmlnode.set_asset_paths({})
+
+    def build(self):
+        with redirect_stdout(StringIO()) as out:
+            main.build_incremental("/", 1, fingerprint=True)
+        return out.getvalue()
+
+    def test_adding_a_linked_asset_rebuilds_the_page(self):
+        self.assertIn("broken link in new.html: /images/new.png", self.build())
+        with open(os.path.join("static", "images", "new.png"), "w") as f:
+            f.write("png")
+        out = self.build()
+        self.assertIn("1 pages generated", out)
+        self.assertNotIn("broken link", out)
+        hashed = htmlnode.asset_paths["images/new.png"]
+        with open(os.path.join("docs", "new.html")) as f:
+            self.assertIn(f'src="/{hashed}"', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
+import os
+import tempfile
 import unittest
-from blocks import markdown_to_blocks, block_to_blocktype, BlockType, markdown_to_html_node # type: ignore
+from blocks import markdown_to_blocks, block_to_blocktype, BlockType, markdown_to_html_node, BlockCache, Block, entry_size, scan_blocks, iter_markdown_html # type: ignore
 
 
 class TestInlineMarkdown(unittest.TestCase):
@@ -42,6 +44,39 @@ with a second line.
             ]
         )
 
+    def test_markdown_to_blocks_fenced_blank_line(self):
+        md = "```\nfirst\n\nsecond\n```\n\nafter"
+        self.assertEqual(markdown_to_blocks(md), ["```\nfirst\n\nsecond\n```", "after"])
+
+    def test_markdown_to_blocks_unclosed_fence(self):
+        md = "```\nnever closed\n\nnext block"
+        self.assertEqual(markdown_to_blocks(md), ["```\nnever closed", "next block"])
+
+    def test_unclosed_fence_blocks_are_normalized(self):
+        md = "```\nx\n\n  # Title"
+        self.assertEqual(markdown_to_blocks(md), ["```\nx", "# Title"])
+        self.assertTrue(markdown_to_html_node(md).to_html().endswith("<h1>Title</h1></div>"))
+        blocks = list(scan_blocks(md.split("\n")))
+        self.assertEqual([(block.start, block.end) for block in blocks], [(0, 2), (3, 4)])
+
+
+class TestScanBlocks(unittest.TestCase):
+    def test_spans_and_types(self):
+        lines = ["", "# Title", "", "- a", "- b", "   ", "```", "code", "", "```", "text"]
+        self.assertEqual(
+            list(scan_blocks(lines)),
+            [
+                Block(BlockType.heading, ["# Title"], 1, 2),
+                Block(BlockType.unordered_list, ["- a", "- b"], 3, 5),
+                Block(BlockType.code, ["```", "code", "", "```"], 6, 10),
+                Block(BlockType.paragraph, ["text"], 10, 11),
+            ],
+        )
+
+    def test_file_lines(self):
+        blocks = list(scan_blocks(["  > quote\n", "> more  \n", "\n"]))
+        self.assertEqual(blocks, [Block(BlockType.quote, ["> quote", "> more"], 0, 2)])
+
 
 class TestBlockToBlockType(unittest.TestCase):
 
@@ -265,7 +300,91 @@ the **same** even with inline stuff
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
-    
+
+    def test_code_with_blank_line(self):
+        md = """
+```python
+a = 1
+
+b = 2
+```
+"""
+
+        node = markdown_to_html_node(md)
+        self.assertEqual(node.to_html(), "<div><pre><code>a = 1\n\nb = 2\n</code></pre></div>")
+
+    def test_basepath(self):
+        md = """
+[home](/index.html) ![a](/a.png)
+
+```
+<a href="/raw">
+```
+"""
+
+        node = markdown_to_html_node(md, "/site/")
+        html = node.to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/site/index.html">home</a> <img src="/site/a.png" alt="a"></img></p><pre><code><a href="/raw">\n</code></pre></div>',
+        )
+
+    def test_iter_markdown_html(self):
+        md = "# Title\n\n> quote\n\n1. one\n2. [two](/2)\n"
+        expected = markdown_to_html_node(md, "/site/").to_html()
+        chunks = iter_markdown_html(md.splitlines(keepends=True), "/site/")
+        self.assertEqual("".join(chunks), expected)
+
+
+class TestBlockCache(unittest.TestCase):
+    md = """
+# Title
+
+Shared **disclaimer** with a [link](/about)
+
+- a
+- b
+
+Shared **disclaimer** with a [link](/about)
+"""
+
+    def test_same_html(self):
+        cache = BlockCache()
+        expected = markdown_to_html_node(self.md, "/site/").to_html()
+        self.assertEqual(markdown_to_html_node(self.md, "/site/", cache).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(self.md, "/site/", cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_basepath_in_key(self):
+        cache = BlockCache()
+        cache.render("[x](/a)", "/one/")
+        self.assertEqual(cache.render("[x](/a)", "/two/"), '<p><a href="/two/a">x</a></p>')
+
+    def test_lru_eviction(self):
+        # room for two entries, whatever the interpreter's object sizes
+        cache = BlockCache(max_bytes=2 * entry_size("0" * 40, "<p>second</p>"))
+        cache.render("first")
+        cache.render("second")
+        cache.render("first")
+        cache.render("third")
+        self.assertEqual(list(cache.entries.values()), ["<p>first</p>", "<p>third</p>"])
+
+    def test_size_counts_more_than_the_html(self):
+        cache = BlockCache()
+        cache.render("block")
+        self.assertGreater(cache.size, 2 * len("<p>block</p>"))
+        self.assertEqual(cache.size, sum(entry_size(key, html) for key, html in cache.entries.items()))
+
+    def test_save_and_load(self):
+        cache = BlockCache()
+        cache.render("block")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            cache.save(path)
+            loaded = BlockCache()
+            loaded.load(path)
+        loaded.render("block")
+        self.assertEqual((loaded.hits, loaded.misses), (1, 0))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,52 @@
+import os
+import unittest
+from pathlib import Path
+
+from buildplan import make_dirs, parent_dirs, plan_build, scan_files # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestBuildPlan(ScratchDir, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        for path in (
+            os.path.join(self.content, "index.md"),
+            os.path.join(self.content, "blog", "b.md"),
+            os.path.join(self.content, "blog", "a", "index.md"),
+            os.path.join(self.content, "contact.md"),
+            os.path.join(self.static, "index.css"),
+            os.path.join(self.static, "images", "deep", "tom.png"),
+        ):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.write(path, "x")
+        # directories without files need no output directory
+        os.makedirs(os.path.join(self.content, "drafts"))
+
+    def test_scan_files_is_sorted(self):
+        self.assertEqual(scan_files(self.content), ["blog/a/index.md", "blog/b.md", "contact.md", "index.md"])
+        self.assertEqual(scan_files(self.static), ["images/deep/tom.png", "index.css"])
+
+    def test_plan(self):
+        plan = plan_build(self.content, self.static, self.docs)
+        self.assertEqual(plan.dirs, ["blog", "blog/a", "images", "images/deep"])
+        self.assertEqual(plan.pages()[0], (os.path.join(self.content, "blog", "a", "index.md"), Path(self.docs, "blog", "a", "index.html")))
+
+        plan.make_dirs()
+        # running it again over existing directories is fine
+        plan.make_dirs()
+        for rel_path in plan.dirs:
+            self.assertTrue(os.path.isdir(os.path.join(self.docs, rel_path)))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "drafts")))
+
+    def test_parent_dirs_include_ancestors(self):
+        self.assertEqual(parent_dirs(["a/b/c/d.txt", "a/e.txt", "f.txt"]), ["a", "a/b", "a/b/c"])
+        make_dirs(self.docs, parent_dirs(["a/b/c/d.txt"]))
+        self.assertTrue(os.path.isdir(os.path.join(self.docs, "a", "b", "c")))
+
+
+if __name__ == "__main__":
+    unittest.main()
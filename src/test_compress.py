@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import compress # type: ignore
+from compress import compress_file, precompress # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestPrecompress(ScratchDir, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.page = os.path.join(self.docs, "blog", "index.html")
+        self.write(self.page, "<p>hello</p>" * 100)
+        self.write(os.path.join(self.docs, "tiny.css"), "body {}")
+        self.write(os.path.join(self.docs, "image.png"), "png" * 200)
+        # kept out of docs/, which would serve it
+        self.state_path = os.path.join(self.root, "state.json")
+
+    def run_precompress(self, jobs=1):
+        with redirect_stdout(StringIO()):
+            return precompress(self.docs, jobs, self.state_path)
+
+    def test_writes_gzip_of_compressible_files(self):
+        totals = self.run_precompress(jobs=2)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 100)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tiny.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "image.png.gz")))
+        count, before, after = totals[".gz"]
+        self.assertEqual((count, before), (1, 1200))
+        self.assertLess(after, before)
+
+    def test_skips_up_to_date(self):
+        self.run_precompress()
+        self.assertEqual(compress_file(self.page, {".gz"}), {})
+        self.write(self.page, "<p>changed</p>" * 100)
+        os.utime(self.page, ns=(0, 10**9))
+        self.assertIn(".gz", compress_file(self.page, {".gz"}))
+
+    def test_removes_orphans(self):
+        self.run_precompress()
+        os.remove(self.page)
+        self.run_precompress()
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+    def test_state_skips_unchanged_files(self):
+        handled = []
+        original = compress.compress_file
+
+        def counting(path, owned=()):
+            handled.append(os.path.relpath(path, self.docs))
+            return original(path, owned)
+
+        compress.compress_file = counting
+        try:
+            self.run_precompress()
+            self.assertEqual(sorted(handled), [os.path.join("blog", "index.html"), "tiny.css"])
+            handled.clear()
+            # the tiny file was skipped last time and is not read again
+            self.run_precompress()
+            self.assertEqual(handled, [])
+            self.write(self.page, "<p>changed</p>" * 100)
+            os.utime(self.page, ns=(0, 10**9))
+            self.run_precompress()
+            self.assertEqual(handled, [os.path.join("blog", "index.html")])
+        finally:
+            compress.compress_file = original
+
+    def test_removes_stale_and_unsupported_copies(self):
+        self.run_precompress()
+        copies = {"blog/index.html.gz"}
+        # older than its source, as when the page changed after the last run
+        os.utime(self.page + ".gz", ns=(0, 1))
+        self.assertEqual(compress.remove_orphans(self.docs, copies), 1)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertEqual(copies, set())
+        if compress.brotli is None:
+            # left by a run that had brotli; it could never be refreshed
+            self.write(self.page + ".br", "old")
+            self.assertEqual(compress.remove_orphans(self.docs, {"blog/index.html.br"}), 1)
+            self.assertFalse(os.path.exists(self.page + ".br"))
+
+    def test_leaves_compressed_files_of_the_site_alone(self):
+        data = os.path.join(self.docs, "data.json")
+        self.write(data, "[1, 2, 3]" * 100)
+        self.write(data + ".gz", "not ours")
+        os.utime(data + ".gz", ns=(0, 1))
+        self.run_precompress()
+        self.write(data, "[4, 5, 6]" * 100)
+        os.remove(self.page)
+        self.run_precompress()
+        with open(data + ".gz") as f:
+            self.assertEqual(f.read(), "not ours")
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        os.remove(data)
+        self.run_precompress()
+        self.assertTrue(os.path.exists(data + ".gz"))
+
+    def test_state_without_copies_adopts_them(self):
+        self.run_precompress()
+        with open(self.state_path) as f:
+            state = json.load(f)
+        del state["copies"]
+        with open(self.state_path, "w") as f:
+            json.dump(state, f)
+        self.write(self.page, "<p>changed</p>" * 100)
+        os.utime(self.page, ns=(0, 10**9))
+        self.run_precompress()
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
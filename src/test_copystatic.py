@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from copystatic import sync_files_recursive # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestSyncFiles(ScratchDir, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_copies_and_records(self):
+        synced = {}
+        sync_files_recursive(self.static, self.docs, synced)
+        self.assertEqual(self.read(os.path.join(self.docs, "images", "a.png")), "png")
+        self.assertEqual(sorted(synced), [os.path.join("images", "a.png"), "index.css"])
+
+    def test_skips_unchanged(self):
+        synced = {}
+        sync_files_recursive(self.static, self.docs, synced)
+        source = os.path.join(self.static, "index.css")
+        dest = os.path.join(self.docs, "index.css")
+        # same size and mtime as the source, so the sync must leave it alone
+        self.write(dest, "BODY {}")
+        stat = os.stat(source)
+        os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(sync_files_recursive(self.static, self.docs, synced), [])
+        self.assertEqual(self.read(dest), "BODY {}")
+        self.write(source, "body { margin: 0 }")
+        self.assertEqual(sync_files_recursive(self.static, self.docs, synced), ["index.css"])
+        self.assertEqual(self.read(dest), "body { margin: 0 }")
+
+    def test_removes_deleted_sources_only(self):
+        synced = {}
+        sync_files_recursive(self.static, self.docs, synced)
+        self.write(os.path.join(self.docs, "index.html"), "generated page")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(sync_files_recursive(self.static, self.docs, synced), [os.path.join("images", "a.png")])
+        # the directory it leaves empty goes too, but not docs/ itself
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_link(self):
+        sync_files_recursive(self.static, self.docs, {}, link=True)
+        source = os.stat(os.path.join(self.static, "index.css"))
+        dest = os.stat(os.path.join(self.docs, "index.css"))
+        self.assertEqual(source.st_ino, dest.st_ino)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from depgraph import DependencyGraph, internal_path, page_inputs # type: ignore
+from pageinfo import PageInfo # type: ignore
+from blocks import markdown_to_html_node # type: ignore
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def graph(self):
+        graph = DependencyGraph()
+        graph.record("index.html", ["template", "content:index.md", "static:images/a.png"], ["/blog", "/images/a.png"])
+        graph.record("blog/index.html", ["template", "content:blog/index.md"], ["/", "/missing", "https://example.com"])
+        return graph
+
+    def test_stale(self):
+        graph = self.graph()
+        self.assertEqual(graph.stale(["static:images/a.png"]), {"index.html"})
+        self.assertEqual(graph.stale(["template"]), {"index.html", "blog/index.html"})
+        self.assertEqual(graph.stale(["static:images/b.png"]), set())
+
+    def test_record_replaces_and_remove_prunes(self):
+        graph = self.graph()
+        graph.record("index.html", ["template", "content:index.md"])
+        self.assertNotIn("static:images/a.png", graph.dependents)
+        graph.remove("blog/index.html")
+        self.assertEqual(graph.stale(["content:blog/index.md"]), set())
+        self.assertEqual(graph.dependents["template"], {"index.html"})
+
+    def test_round_trip(self):
+        graph = DependencyGraph.from_dict(self.graph().to_dict())
+        self.assertEqual(graph.stale(["static:images/a.png"]), {"index.html"})
+        self.assertEqual(graph.links["blog/index.html"], ["/", "/missing", "https://example.com"])
+
+    def test_broken_links(self):
+        graph = self.graph()
+        targets = {"index.html", "blog/index.html", "images/a.png"}
+        self.assertEqual(graph.broken_links(targets), [("blog/index.html", "/missing")])
+        self.assertEqual(graph.broken_links(targets, ["index.html"]), [])
+
+    def test_internal_path(self):
+        self.assertEqual(internal_path("blog/index.html", "/images/a.png#top"), "images/a.png")
+        self.assertEqual(internal_path("blog/tom/index.html", "../majesty"), "blog/majesty")
+        self.assertEqual(internal_path("index.html", "/"), "")
+        self.assertIsNone(internal_path("index.html", "mailto:me@example.com"))
+        self.assertIsNone(internal_path("index.html", "https://example.com/a"))
+
+
+class TestPageInfo(unittest.TestCase):
+    def test_collected_while_rendering(self):
+        info = PageInfo()
+        markdown = "# T\n\n![a](/a.png) and [b](/b)\n\n```\n[not](/a-link)\n```"
+        markdown_to_html_node(markdown, "/site/", None, info.add_block)
+        self.assertEqual(info.images, ["/a.png"])
+        self.assertEqual(info.links, ["/b"])
+        self.assertEqual(
+            page_inputs("index.html", "index.md", info),
+            ["template", "basepath", "content:index.md", "static:a.png", "static:b"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import unittest
+
+import fileio # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestFileIO(ScratchDir, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "page.md")
+        with open(self.path, "wb") as f:
+            f.write("# Title\r\n\r\nünïcode text\nold mac\rline\r\rlast line".encode("utf-8"))
+
+    def tearDown(self):
+        fileio.set_backend("buffered")
+
+    def test_backends_read_the_same(self):
+        fileio.set_backend("buffered")
+        expected = fileio.read_text(self.path)
+        with fileio.open_lines(self.path) as lines:
+            expected_lines = list(lines)
+        fileio.set_backend("mmap")
+        self.assertEqual(fileio.read_text(self.path), expected)
+        with fileio.open_lines(self.path) as lines:
+            self.assertEqual(list(lines), expected_lines)
+        self.assertEqual(expected_lines[0], "# Title\n")
+        self.assertEqual(expected_lines[3:], ["old mac\n", "line\n", "\n", "last line"])
+
+    def test_mmap_empty_file(self):
+        fileio.set_backend("mmap")
+        empty = os.path.join(self.root, "empty.md")
+        open(empty, "w").close()
+        self.assertEqual(fileio.read_text(empty), "")
+
+    def test_copy_file(self):
+        data = os.urandom(3 * 2**20 + 17)
+        source = os.path.join(self.root, "image.png")
+        with open(source, "wb") as f:
+            f.write(data)
+        for backend in fileio.backends:
+            fileio.set_backend(backend)
+            dest = os.path.join(self.root, f"copy-{backend}.png")
+            fileio.copy_file(source, dest)
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            fileio.set_backend("carrier-pigeon")
+
+
+if __name__ == "__main__":
+    unittest.main()
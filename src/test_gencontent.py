@@ -1,6 +1,16 @@
+import os
+import threading
+import time
+import tracemalloc
 import unittest
 
-from gencontent import extract_title
+import gencontent # type: ignore
+
+from gencontent import PageError, extract_title, find_pages, generate_pages, generate_pages_incremental # type: ignore
+from blocks import BlockCache # type: ignore
+from manifest import new_manifest # type: ignore
+from profiling import BuildProfile # type: ignore
+from fixtures import ScratchDir # type: ignore
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +56,257 @@ no title
             pass
 
 
+class SiteFixture(ScratchDir):
+    # a two page site in a scratch directory; no tests of its own
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+
+
+class TestIncrementalBuild(SiteFixture, unittest.TestCase):
+    def build(self, manifest, basepath="/"):
+        generate_pages_incremental(self.content, self.template, self.docs, basepath, manifest)
+
+    def test_skips_unchanged_pages(self):
+        manifest = new_manifest()
+        self.build(manifest)
+        index = os.path.join(self.docs, "index.html")
+        post = os.path.join(self.docs, "blog", "post.html")
+        os.remove(index)
+        post_mtime = os.stat(post).st_mtime_ns
+        self.build(manifest)
+        self.assertTrue(os.path.exists(index))
+        self.assertEqual(post_mtime, os.stat(post).st_mtime_ns)
+        self.assertEqual(sorted(manifest["pages"]), ["blog/post.md", "index.md"])
+
+    def test_hashes_only_sources_whose_stamp_moved(self):
+        manifest = new_manifest()
+        self.build(manifest)
+        source = os.path.join(self.content, "index.md")
+        index = os.path.join(self.docs, "index.html")
+        os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+        os.utime(index, ns=(0, 0))
+        hashed = []
+        hash_file = gencontent.hash_file
+
+        def counting_hash_file(path):
+            hashed.append(path)
+            return hash_file(path)
+
+        gencontent.hash_file = counting_hash_file
+        try:
+            self.build(manifest)
+        finally:
+            gencontent.hash_file = hash_file
+        self.assertEqual(hashed, [self.template, source])
+        # same bytes under a new mtime: hashed, but not rebuilt
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+
+    def test_removes_deleted_pages(self):
+        manifest = new_manifest()
+        self.build(manifest)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build(manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertEqual(list(manifest["pages"]), ["index.md"])
+
+    def test_basepath_change_rebuilds(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post.html)")
+        manifest = new_manifest()
+        self.build(manifest)
+        post = os.path.join(self.docs, "blog", "post.html")
+        os.utime(post, ns=(0, 0))
+        self.build(manifest, "/site/")
+        self.assertEqual(manifest["basepath"], "/site/")
+        with open(os.path.join(self.docs, "index.html")) as f:
+            self.assertIn('<a href="/site/blog/post.html">post</a>', f.read())
+        # pages without links are rewritten too
+        self.assertNotEqual(os.stat(post).st_mtime_ns, 0)
+
+    def test_static_change_rebuilds_dependents(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![logo](/images/logo.png)\n\n[post](/blog/post.html)")
+        manifest = new_manifest()
+        manifest["static"] = {os.path.join("images", "logo.png"): [3, 0]}
+        self.build(manifest)
+        self.assertIn("static:images/logo.png", manifest["graph"].inputs["index.html"])
+        index = os.path.join(self.docs, "index.html")
+        post = os.path.join(self.docs, "blog", "post.html")
+        os.utime(index, ns=(0, 0))
+        os.utime(post, ns=(0, 0))
+        generate_pages_incremental(self.content, self.template, self.docs, "/", manifest, static_changed=[os.path.join("images", "logo.png")])
+        self.assertNotEqual(os.stat(index).st_mtime_ns, 0)
+        self.assertEqual(os.stat(post).st_mtime_ns, 0)
+
+
+class TestStreamingPage(SiteFixture, unittest.TestCase):
+    def test_matches_in_memory_page(self):
+        source = os.path.join(self.content, "big.md")
+        self.write(source, "intro\n\n# Big\n\n```\ncode\n\nmore\n```\n\n- [a](/a)\n- **b**\n")
+        gencontent.write_page(source, self.template, os.path.join(self.docs, "memory.html"), "/site/")
+        threshold = gencontent.stream_threshold
+        gencontent.stream_threshold = 0
+        try:
+            gencontent.write_page(source, self.template, os.path.join(self.docs, "stream.html"), "/site/")
+        finally:
+            gencontent.stream_threshold = threshold
+        with open(os.path.join(self.docs, "memory.html")) as f:
+            expected = f.read()
+        with open(os.path.join(self.docs, "stream.html")) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertTrue(expected.startswith("<title>Big</title><div><p>intro</p>"))
+
+    def test_minified_stream_matches_in_memory_page(self):
+        source = os.path.join(self.content, "big.md")
+        self.write(source, "# Big\n\n```\ncode\n   indented\n```\n\nsome   words")
+        gencontent.set_minify(True)
+        threshold = gencontent.stream_threshold
+        try:
+            gencontent.write_page(source, self.template, os.path.join(self.docs, "memory.html"), "/")
+            gencontent.stream_threshold = 0
+            gencontent.write_page(source, self.template, os.path.join(self.docs, "stream.html"), "/")
+        finally:
+            gencontent.stream_threshold = threshold
+            gencontent.set_minify(False)
+        with open(os.path.join(self.docs, "memory.html")) as f:
+            expected = f.read()
+        with open(os.path.join(self.docs, "stream.html")) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertIn("<pre><code>code\n   indented\n</code></pre><p>some words</p>", expected)
+
+    def test_stream_memory_stays_flat_with_default_cache(self):
+        source = os.path.join(self.content, "big.md")
+        with open(source, "w") as f:
+            f.write("# Big\n\n")
+            for i in range(20000):
+                # no links: the page's link list is kept for the site index
+                f.write(f"Paragraph {i} with **bold** and _italic_ text in it.\n\n")
+        size = os.path.getsize(source)
+        # the block cache is on by default
+        gencontent.set_block_cache(BlockCache())
+        threshold = gencontent.stream_threshold
+        gencontent.stream_threshold = 0
+        tracemalloc.start()
+        try:
+            gencontent.write_page(source, self.template, os.path.join(self.docs, "big.html"), "/")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            gencontent.stream_threshold = threshold
+            gencontent.set_block_cache(None)
+        self.assertLess(peak, size // 4)
+        self.assertGreater(os.path.getsize(os.path.join(self.docs, "big.html")), size)
+
+
+class TestProfiledPage(SiteFixture, unittest.TestCase):
+    def test_same_output_and_stages(self):
+        source = os.path.join(self.content, "blog", "post.md")
+        gencontent.write_page(source, self.template, os.path.join(self.docs, "plain.html"), "/")
+        profile = BuildProfile()
+        gencontent.set_profile(profile)
+        try:
+            gencontent.write_page(source, self.template, os.path.join(self.docs, "profiled.html"), "/")
+        finally:
+            gencontent.set_profile(None)
+        with open(os.path.join(self.docs, "plain.html")) as f:
+            expected = f.read()
+        with open(os.path.join(self.docs, "profiled.html")) as f:
+            self.assertEqual(f.read(), expected)
+        page = profile.pages[0]
+        self.assertEqual(page["path"], source)
+        self.assertEqual(list(page["stages"]), ["read", "block_parse", "inline_parse", "to_html", "template", "write"])
+        self.assertEqual(page["nodes"], 3)
+
+    def test_block_cache_does_not_skew_stages(self):
+        source = os.path.join(self.content, "blog", "post.md")
+        self.write(source, "# Post\n\nSome **bold** and _italic_ text.")
+        nodes = []
+        for cache in (None, BlockCache()):
+            gencontent.set_block_cache(cache)
+            profile = BuildProfile()
+            gencontent.set_profile(profile)
+            try:
+                # twice, so the second render could come from the cache
+                for _ in range(2):
+                    gencontent.write_page(source, self.template, os.path.join(self.docs, "profiled.html"), "/")
+            finally:
+                gencontent.set_profile(None)
+                gencontent.set_block_cache(None)
+            nodes.append([page["nodes"] for page in profile.pages])
+        self.assertEqual(nodes[0], nodes[1])
+        self.assertGreater(nodes[0][0], 3)
+
+
+class TestParallelBuild(SiteFixture, unittest.TestCase):
+    def test_matches_serial_build(self):
+        serial_docs = os.path.join(self.root, "serial")
+        generate_pages(find_pages(self.content, serial_docs), self.template, "/", 1)
+        generate_pages(find_pages(self.content, self.docs), self.template, "/", 2)
+        self.assertEqual(self.read_tree(serial_docs), self.read_tree(self.docs))
+
+    def test_error_names_source(self):
+        bad = os.path.join(self.content, "blog", "untitled.md")
+        self.write(bad, "no title here")
+        with self.assertRaises(PageError) as cm:
+            generate_pages(find_pages(self.content, self.docs), self.template, "/", 2)
+        self.assertEqual(cm.exception.from_path, bad)
+        self.assertIn("no title found", str(cm.exception))
+
+
+class TestPipelineBuild(SiteFixture, unittest.TestCase):
+    def test_matches_serial_build(self):
+        self.write(os.path.join(self.content, "big.md"), "# Big\n\n- [a](/a)\n")
+        serial_docs = os.path.join(self.root, "serial")
+        generate_pages(find_pages(self.content, serial_docs), self.template, "/site/", 1)
+        threshold = gencontent.stream_threshold
+        # the big page takes the streaming branch of the pipeline
+        gencontent.stream_threshold = 10
+        try:
+            generate_pages(find_pages(self.content, self.docs), self.template, "/site/", 1, io_depth=2)
+        finally:
+            gencontent.stream_threshold = threshold
+        self.assertEqual(self.read_tree(serial_docs), self.read_tree(self.docs))
+
+    def test_reads_overlap(self):
+        for i in range(6):
+            self.write(os.path.join(self.content, f"page{i}.md"), f"# Page {i}")
+        read_source = gencontent._read_source
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def slow_read(from_path):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return read_source(from_path)
+
+        gencontent._read_source = slow_read
+        try:
+            infos = generate_pages(find_pages(self.content, self.docs), self.template, "/", 1, io_depth=3)
+        finally:
+            gencontent._read_source = read_source
+        self.assertEqual(len(infos), 8)
+        self.assertEqual(in_flight[1], 3)
+
+    def test_error_names_source(self):
+        bad = os.path.join(self.content, "blog", "untitled.md")
+        self.write(bad, "no title here")
+        with self.assertRaises(PageError) as cm:
+            generate_pages(find_pages(self.content, self.docs), self.template, "/", 1, io_depth=2)
+        self.assertEqual(cm.exception.from_path, bad)
+        self.assertIn("1 of 3 pages failed", str(cm.exception))
+        # the other pages are still written
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode # type: ignore
+from htmlnode import HTMLNode, LeafNode, ParentNode, rebase_urls # type: ignore
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -67,5 +68,35 @@ class TestParentNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+            ParentNode("a", [LeafNode(None, "x")], {"href": "/x"}),
+        ])
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_write_html_deep_tree(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        out = io.StringIO()
+        node.write_html(out)
+        self.assertEqual(out.getvalue(), "<span>" * 5000 + "x" + "</span>" * 5000)
+
+    def test_no_tag(self):
+        with self.assertRaises(ValueError):
+            ParentNode(None, [LeafNode(None, "x")]).to_html()
+
+
+class TestRebaseUrls(unittest.TestCase):
+    def test_rebase(self):
+        link = LeafNode("a", "home", {"href": "/blog"})
+        external = LeafNode("a", "out", {"href": "https://boot.dev"})
+        image = LeafNode("img", "", {"src": "/images/a.png", "alt": "/a"})
+        rebase_urls(ParentNode("div", [ParentNode("p", [link, external]), image]), "/site/")
+        self.assertEqual(link.props["href"], "/site/blog")
+        self.assertEqual(external.props["href"], "https://boot.dev")
+        self.assertEqual(image.props, {"src": "/site/images/a.png", "alt": "/a"})
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -166,6 +166,19 @@ class TestInlineMarkdown(unittest.TestCase):
             new_nodes,
     )
 
+    def test_split_links_skips_image_with_same_text(self):
+        # the link is cut at its own offset, not at the first identical text
+        node = TextNode("![a](b) then [a](b)", TextType.plain)
+        self.assertListEqual(
+            [TextNode("![a](b) then ", TextType.plain), TextNode("a", TextType.link, "b")],
+            split_nodes_link([node]),
+        )
+
+    def test_plain_text_fast_path(self):
+        self.assertListEqual([TextNode("no markup here!", TextType.plain)], text_to_textnodes("no markup here!"))
+        self.assertListEqual([], text_to_textnodes(""))
+        self.assertListEqual([], extract_markdown_links("no links"))
+
 
     def test_text_to_textnodes(self):
         text = (
@@ -194,6 +207,37 @@ class TestInlineMarkdown(unittest.TestCase):
         
         self.assertListEqual(answer, test)
 
+    def test_text_to_textnodes_link_with_markup(self):
+        nodes = text_to_textnodes("see [**bold** link](https://a.com/x_y_z) now")
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.plain),
+                TextNode("**bold** link", TextType.link, "https://a.com/x_y_z"),
+                TextNode(" now", TextType.plain),
+            ],
+            nodes,
+        )
+        html = text_node_to_html_node(nodes[1]).to_html()
+        self.assertEqual(html, '<a href="https://a.com/x_y_z"><b>bold</b> link</a>')
+
+    def test_text_to_textnodes_intraword_underscore(self):
+        nodes = text_to_textnodes("call snake_case_name or _this_")
+        self.assertListEqual(
+            [
+                TextNode("call snake_case_name or ", TextType.plain),
+                TextNode("this", TextType.italic),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_unclosed_is_literal(self):
+        nodes = text_to_textnodes("2 ** 3 and `tick and [bracket")
+        self.assertListEqual([TextNode("2 ** 3 and `tick and [bracket", TextType.plain)], nodes)
+
+    def test_text_to_textnodes_code_is_not_split(self):
+        nodes = text_to_textnodes("`a **b** [c](d)`")
+        self.assertListEqual([TextNode("a **b** [c](d)", TextType.code)], nodes)
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+import http.client
+import os
+import unittest
+
+from lazyserver import LazySite, start_lazy_server # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestLazySite(ScratchDir, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.root
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "contact.md"), "# Contact")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom\n\nA [link](/contact.html)")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "tom.png"), "png")
+        self.site = LazySite(self.content, self.static, self.template, "/site/")
+
+    def test_resolve(self):
+        self.assertEqual(self.site.resolve("/site/"), ("page", os.path.join(self.content, "index.md")))
+        self.assertEqual(self.site.resolve("/site/index.html"), ("page", os.path.join(self.content, "index.md")))
+        self.assertEqual(self.site.resolve("/site/contact.html"), ("page", os.path.join(self.content, "contact.md")))
+        self.assertEqual(self.site.resolve("/site/blog/tom/"), ("page", os.path.join(self.content, "blog", "tom", "index.md")))
+        self.assertEqual(self.site.resolve("/site/blog/tom"), ("redirect", "/site/blog/tom/"))
+        self.assertEqual(self.site.resolve("/site"), ("redirect", "/site/"))
+        self.assertEqual(self.site.resolve("/site/images/tom.png"), ("static", os.path.join(self.static, "images", "tom.png")))
+        self.assertIsNone(self.site.resolve("/site/missing.html"))
+        self.assertIsNone(self.site.resolve("/other/index.html"))
+        self.assertIsNone(self.site.resolve("/site/../template.html"))
+
+    def test_page_is_cached_until_its_source_changes(self):
+        source = os.path.join(self.content, "contact.md")
+        self.write(source, "# Contact", 1_000_000_000)
+        self.assertEqual(self.site.page(source), b"<title>Contact</title><div><h1>Contact</h1></div>")
+        self.site.page(source)
+        self.assertEqual((self.site.hits, self.site.misses), (1, 1))
+
+        self.write(source, "# Reach us", 2_000_000_000)
+        self.assertEqual(self.site.page(source), b"<title>Reach us</title><div><h1>Reach us</h1></div>")
+        self.assertEqual((self.site.hits, self.site.misses), (1, 2))
+
+    def test_template_change_invalidates_pages(self):
+        source = os.path.join(self.content, "contact.md")
+        self.write(self.template, "{{ Content }}", 1_000_000_000)
+        self.site.page(source)
+        self.write(self.template, "<main>{{ Content }}</main>", 2_000_000_000)
+        self.assertEqual(self.site.page(source), b"<main><div><h1>Contact</h1></div></main>")
+        self.assertEqual(self.site.misses, 2)
+
+    def test_least_recently_used_pages_are_evicted(self):
+        home = os.path.join(self.content, "index.md")
+        contact = os.path.join(self.content, "contact.md")
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        # room for two of the three pages
+        self.site.max_bytes = len(self.site.page(home)) + len(self.site.page(tom))
+        self.site.page(contact)
+        self.site.page(home)
+        self.site.page(tom)
+        self.assertEqual(list(self.site.entries), [home, tom])
+        self.assertLessEqual(self.site.size, self.site.max_bytes)
+
+    def test_serves_pages_and_static_files(self):
+        server = start_lazy_server(self.site, 0, quiet=True)
+        connection = http.client.HTTPConnection("localhost", server.server_address[1])
+        try:
+            connection.request("GET", "/site/blog/tom/")
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertIn(b'<a href="/site/contact.html">link</a>', response.read())
+
+            connection.request("GET", "/site/index.css")
+            response = connection.getresponse()
+            self.assertEqual((response.status, response.getheader("Content-Type"), response.read()), (200, "text/css", b"body {}"))
+
+            connection.request("GET", "/site/blog/tom")
+            response = connection.getresponse()
+            response.read()
+            self.assertEqual((response.status, response.getheader("Location")), (301, "/site/blog/tom/"))
+
+            connection.request("GET", "/site/missing.html")
+            response = connection.getresponse()
+            response.read()
+            self.assertEqual(response.status, 404)
+        finally:
+            connection.close()
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
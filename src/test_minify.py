@@ -0,0 +1,41 @@
+import random
+import unittest
+
+from minify import minify, minify_chunks # type: ignore
+
+
+class TestMinify(unittest.TestCase):
+    def test_whitespace_between_block_tags(self):
+        self.assertEqual(minify("<div>\n  <p> text </p>\n</div>\n"), "<div><p>text</p></div>")
+
+    def test_inline_whitespace_collapses_to_one_space(self):
+        self.assertEqual(minify("<p>a  <b>b</b>\n <i>c</i>\tend</p>"), "<p>a <b>b</b> <i>c</i> end</p>")
+
+    def test_pre_is_untouched(self):
+        html = '<pre><code>def f():\n    return  1\n</code></pre>\n<p>x</p>'
+        self.assertEqual(minify(html), '<pre><code>def f():\n    return  1\n</code></pre><p>x</p>')
+
+    def test_tags_and_comments_untouched(self):
+        html = '<a href="/x  y" title="a  b">link</a> <!-- keep  this --> after'
+        # the one space between the words is written after the comment
+        self.assertEqual(minify(html), '<a href="/x  y" title="a  b">link</a><!-- keep  this --> after')
+
+    def test_non_breaking_space_kept(self):
+        self.assertEqual(minify("<p>a\xa0 \xa0b</p>"), "<p>a\xa0 \xa0b</p>")
+
+    def test_any_chunking_gives_the_same_output(self):
+        html = (
+            "<!DOCTYPE html>\n<html>\n<head>\n  <title> T </title>\n</head>\n<body>\n"
+            "<!-- c -->\n<p>some <b>bold</b>  text</p>\n<pre><code>a\n  b</code></pre>\n"
+            "<script>if (x)\n  y()</script>\n</body>\n</html>\n"
+        )
+        expected = minify(html)
+        rng = random.Random(7)
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(html)), rng.randint(1, 40)))
+            chunks = [html[a:b] for a, b in zip([0] + cuts, cuts + [len(html)])]
+            self.assertEqual("".join(minify_chunks(chunks)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
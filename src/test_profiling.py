@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from htmlnode import LeafNode, ParentNode # type: ignore
+from profiling import BuildProfile, PageProfile, count_nodes # type: ignore
+
+
+class TestProfiling(unittest.TestCase):
+    def test_page_profile(self):
+        page = PageProfile("a.md")
+        self.assertEqual(page.time("read", lambda x: x + 1, 1), 2)
+        page.time("read", lambda: None)
+        self.assertEqual(list(page.stages), ["read"])
+        self.assertEqual(page.to_dict()["seconds"], page.stages["read"])
+
+    def test_count_nodes(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "a"), LeafNode("b", "c")])])
+        self.assertEqual(count_nodes(node), 4)
+
+    def test_report_sorted_slowest_first(self):
+        profile = BuildProfile()
+        profile.add({"path": "fast.md", "seconds": 0.001, "stages": {"read": 0.001}, "nodes": 3})
+        profile.add({"path": "slow.md", "seconds": 0.5, "stages": {"read": 0.1, "write": 0.4}, "nodes": 9})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            with redirect_stdout(StringIO()):
+                profile.write_report(path, top=1)
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(report["slowest"], ["slow.md"])
+        self.assertEqual(report["nodes"], 12)
+        self.assertAlmostEqual(report["stages"]["read"], 0.101)
+
+
+if __name__ == "__main__":
+    unittest.main()
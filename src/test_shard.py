@@ -0,0 +1,122 @@
+import os
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+
+import htmlnode # type: ignore
+import main # type: ignore
+from shard import merge_shards, parse_shard, shard_dir, shard_of, shard_pages # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestPartition(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("0/4", "5/4", "1/0", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_shard_of_is_stable(self):
+        # a fixed value, so a change in the hash that would move pages between shards shows up here
+        self.assertEqual(shard_of("blog/post.md", 7), shard_of(os.path.join("blog", "post.md"), 7))
+        self.assertEqual([shard_of(f"page{i}.md", 3) for i in range(6)], [2, 3, 1, 3, 2, 3])
+
+    def test_every_page_in_exactly_one_shard(self):
+        pages = [(os.path.join("content", f"{i}.md"), f"docs/{i}.html") for i in range(50)]
+        shards = [shard_pages(pages, "content", index, 4) for index in range(1, 5)]
+        self.assertEqual(sorted(page for shard in shards for page in shard), sorted(pages))
+        self.assertTrue(all(shards))
+
+
+class TestMerge(ScratchDir, unittest.TestCase):
+    # drives main's shard, merge and full builds in a scratch site
+    chdir = True
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join("content", "blog"))
+        os.makedirs("static")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join("static", "index.css"), "body {}")
+        self.write(os.path.join("content", "index.md"), "# Home\n\nWelcome.")
+        for i in range(6):
+            self.write(os.path.join("content", "blog", f"{i}.md"), f"# Post {i}\n\nAbout {i}.")
+
+    def tearDown(self):
+        htmlnode.set_asset_paths({})
+
+    def build_shards(self, count, fingerprint=False):
+        with redirect_stdout(StringIO()):
+            for index in range(1, count + 1):
+                main.build_shard("/", 1, (index, count), fingerprint=fingerprint)
+
+    def test_build_shard_writes_its_pages(self):
+        self.build_shards(3)
+        pages = main.find_pages(main.dir_path_content, main.dir_path_public)
+        for index in range(1, 4):
+            dest = shard_dir(main.dir_path_shards, index, 3)
+            expected = [os.path.relpath(str(output), main.dir_path_public) for _, output in shard_pages(pages, main.dir_path_content, index, 3)]
+            self.assertEqual(sorted(self.read_tree(dest)), sorted(expected))
+
+    def test_merge_matches_full_build(self):
+        with redirect_stdout(StringIO()):
+            main.build_full("/", 1, site_url="https://example.com")
+        full = self.read_tree(main.dir_path_public)
+        self.assertIn("sitemap.xml", full)
+        self.build_shards(3)
+        with redirect_stdout(StringIO()):
+            main.merge(["3", "--site-url", "https://example.com"])
+        self.assertEqual(self.read_tree(main.dir_path_public), full)
+        self.assertFalse(os.path.exists(main.dir_path_shards))
+
+    def test_duplicate_output_is_rejected(self):
+        self.build_shards(2)
+        os.makedirs(main.dir_path_public)
+        self.write(os.path.join(main.dir_path_public, "old.html"), "old")
+        # the same page written by both shards
+        shards = [shard_dir(main.dir_path_shards, index, 2) for index in (1, 2)]
+        rel_path = next(name for name in os.listdir(os.path.join(shards[0], "blog")))
+        os.makedirs(os.path.join(shards[1], "blog"), exist_ok=True)
+        self.write(os.path.join(shards[1], "blog", rel_path), "again")
+        with self.assertRaises(ValueError) as cm:
+            merge_shards(main.dir_path_shards, 2, main.dir_path_static, main.dir_path_public)
+        self.assertIn(os.path.join("blog", rel_path), str(cm.exception))
+        # nothing was touched
+        self.assertTrue(os.path.exists(os.path.join(main.dir_path_public, "old.html")))
+        self.assertTrue(os.path.isdir(main.dir_path_shards))
+        # the command reports it as a usage error instead of a traceback
+        with redirect_stderr(StringIO()) as err, self.assertRaises(SystemExit):
+            main.merge(["2"])
+        self.assertIn("more than one shard", err.getvalue())
+
+    def test_merge_removes_only_its_shards(self):
+        self.build_shards(3)
+        self.build_shards(2)
+        self.write(os.path.join(main.dir_path_shards, "notes.txt"), "keep")
+        with redirect_stdout(StringIO()):
+            merge_shards(main.dir_path_shards, 2, main.dir_path_static, main.dir_path_public)
+        self.assertEqual(
+            sorted(os.listdir(main.dir_path_shards)),
+            ["1-of-3", "1-of-3.meta.json", "2-of-3", "2-of-3.meta.json", "3-of-3", "3-of-3.meta.json", "notes.txt"],
+        )
+
+    def test_mismatched_settings_are_rejected(self):
+        self.build_shards(2, fingerprint=True)
+        with self.assertRaises(ValueError) as cm:
+            merge_shards(main.dir_path_shards, 2, main.dir_path_static, main.dir_path_public)
+        self.assertIn("--fingerprint", str(cm.exception))
+        with redirect_stdout(StringIO()):
+            main.build_shard("/", 1, (2, 2), fingerprint=True, minify=True)
+        with self.assertRaises(ValueError) as cm:
+            merge_shards(main.dir_path_shards, 2, main.dir_path_static, main.dir_path_public, fingerprint=True)
+        self.assertIn("different minify settings", str(cm.exception))
+        self.assertTrue(os.path.isdir(shard_dir(main.dir_path_shards, 1, 2)))
+
+    def test_missing_shard(self):
+        self.build_shards(2)
+        with self.assertRaises(ValueError):
+            merge_shards(main.dir_path_shards, 3, main.dir_path_static, main.dir_path_public)
+
+
+if __name__ == "__main__":
+    unittest.main()
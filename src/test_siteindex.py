@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
+from io import StringIO
+
+from blocks import markdown_to_html_node # type: ignore
+from pageinfo import PageInfo, plain_text # type: ignore
+from siteindex import page_url, write_site_indexes # type: ignore
+
+
+class TestPageMetadata(unittest.TestCase):
+    def test_plain_text(self):
+        self.assertEqual(plain_text("**Bold** and _it_ with `code`,\n[a link](/x) ![img](/i.png) snake_case"), "Bold and it with code, a link snake_case")
+
+    def test_summary_skips_navigation(self):
+        info = PageInfo()
+        markdown_to_html_node("# Title\n\n[< Back](/)\n\n> quote\n\nFirst **words**.\n\nSecond.", None, None, info.add_block)
+        self.assertEqual(info.summary, "First words.")
+        self.assertEqual(info.links, ["/"])
+
+
+class TestSiteIndexes(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/"), "/")
+        self.assertEqual(page_url("blog/tom/index.html", "/site/", "https://example.com/"), "https://example.com/site/blog/tom/")
+        self.assertEqual(page_url("about.html", "/"), "/about.html")
+
+    def test_write_site_indexes(self):
+        meta = {
+            "index.html": {"source": "index.md", "title": "Home & more", "summary": "Hi", "links": ["/blog/a"], "images": []},
+            "blog/a/index.html": {"source": "blog/a/index.md", "title": "A <post>", "summary": "About a", "links": [], "images": ["/a.png"]},
+        }
+        with tempfile.TemporaryDirectory() as docs:
+            with redirect_stdout(StringIO()):
+                write_site_indexes(docs, meta, "/", "https://example.com")
+            sitemap = ET.parse(os.path.join(docs, "sitemap.xml")).getroot()
+            feed = ET.parse(os.path.join(docs, "blog", "feed.xml")).getroot()
+            with open(os.path.join(docs, "search-index.json")) as f:
+                index = json.load(f)
+        ns = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+        self.assertEqual([loc.text for loc in sitemap.iter(ns + "loc")], ["https://example.com/blog/a/", "https://example.com/"])
+        self.assertEqual(feed.findtext("channel/title"), "Home & more")
+        self.assertEqual([item.findtext("title") for item in feed.iter("item")], ["A <post>"])
+        self.assertEqual(index[0], {"url": "/blog/a/", "title": "A <post>", "summary": "About a", "links": [], "images": ["/a.png"]})
+        self.assertEqual(len(index), 2)
+
+    def test_no_sitemap_or_feed_without_site_url(self):
+        meta = {"blog/a.html": {"source": "blog/a.md", "title": "A", "summary": "", "links": [], "images": []}}
+        with tempfile.TemporaryDirectory() as docs:
+            with redirect_stdout(StringIO()):
+                write_site_indexes(docs, meta, "/", "https://example.com")
+                write_site_indexes(docs, meta, "/", "")
+            self.assertEqual(sorted(os.listdir(docs)), ["blog", "search-index.json"])
+            self.assertEqual(os.listdir(os.path.join(docs, "blog")), [])
+
+    def test_feed_removed_with_the_last_post(self):
+        post = {"blog/a.html": {"source": "blog/a.md", "title": "A", "summary": "", "links": [], "images": []}}
+        home = {"index.html": {"source": "index.md", "title": "Home", "summary": "", "links": [], "images": []}}
+        with tempfile.TemporaryDirectory() as docs:
+            with redirect_stdout(StringIO()):
+                write_site_indexes(docs, {**home, **post}, "/", "https://example.com")
+                self.assertTrue(os.path.exists(os.path.join(docs, "blog", "feed.xml")))
+                write_site_indexes(docs, home, "/", "https://example.com")
+            self.assertFalse(os.path.exists(os.path.join(docs, "blog", "feed.xml")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import io
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode # type: ignore
+from template import Template, load_template # type: ignore
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        page = template.render({"Title": "Hi", "Content": "<p>text</p>"})
+        self.assertEqual(page, "<title>Hi</title><body><p>text</p></body>")
+
+    def test_parts(self):
+        template = Template("a{{ Title }}b")
+        self.assertEqual(template.parts, ["a", "{{ Title }}", "b"])
+        self.assertEqual(template.slots, [(1, "Title")])
+
+    def test_unknown_placeholder_left_alone(self):
+        template = Template("{{ Title }} {{ Other }}")
+        self.assertEqual(template.render({"Title": "x"}), "x {{ Other }}")
+
+    def test_values_not_rescanned(self):
+        template = Template("{{ Title }}|{{ Content }}")
+        page = template.render({"Title": "{{ Content }}", "Content": '<a href="/x">x</a>'})
+        self.assertEqual(page, '{{ Content }}|<a href="/x">x</a>')
+
+    def test_write_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}{{ Other }}")
+        out = io.StringIO()
+        node = ParentNode("div", [LeafNode("b", "hi")])
+        template.write(out, {"Title": "T", "Content": node})
+        self.assertEqual(out.getvalue(), "<title>T</title><div><b>hi</b></div>{{ Other }}")
+
+    def test_basepath(self):
+        template = Template('<link href="/index.css"><img src="/a.png">{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": ""}),
+            '<link href="/site/index.css"><img src="/site/a.png">',
+        )
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def test_cached_until_modified(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("one {{ Title }}")
+            first = load_template(path, "/")
+            self.assertIs(first, load_template(path, "/"))
+            with open(path, "w") as f:
+                f.write("two {{ Title }}")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path, "/").render({"Title": "x"}), "two x")
+
+
+if __name__ == "__main__":
+    unittest.main()
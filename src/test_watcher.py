@@ -0,0 +1,125 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import gencontent # type: ignore
+import main # type: ignore
+from manifest import new_manifest # type: ignore
+from devserver import inject_reload_script, reload_script # type: ignore
+from watcher import SiteWatcher # type: ignore
+from fixtures import ScratchDir # type: ignore
+
+
+class TestSiteWatcher(ScratchDir, unittest.TestCase):
+    # rebuilds go through main.build_incremental in a scratch site, with the
+    # manifest kept in memory as main.watch keeps it
+    chdir = True
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join("content", "blog"))
+        os.makedirs("static")
+        self.write("template.html", "{{ Title }}  {{ Content }}")
+        self.write(os.path.join("content", "index.md"), "# Home")
+        self.write(os.path.join("content", "blog", "post.md"), "# Post")
+        self.builds = 0
+        self.manifest = new_manifest()
+        self.rebuild()
+        self.watcher = SiteWatcher("content", "static", "template.html", self.rebuild)
+
+    def tearDown(self):
+        gencontent.set_minify(False)
+
+    def rebuild(self, changed=None):
+        self.builds += 1
+        with redirect_stdout(StringIO()):
+            self.manifest = main.build_incremental("/", 1, manifest=self.manifest, changed=changed)
+
+    def read(self, path):
+        with open(os.path.join("docs", path)) as f:
+            return f.read()
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.builds, 1)
+
+    def test_content_change_rebuilds_page_and_index(self):
+        self.write(os.path.join("content", "blog", "post.md"), "# Edited post")
+        self.assertEqual(self.watcher.poll(), [os.path.join("content", "blog", "post.md")])
+        self.assertEqual(self.read(os.path.join("blog", "post.html")), "Edited post  <div><h1>Edited post</h1></div>")
+        self.assertIn("Edited post", self.read("search-index.json"))
+
+    def test_template_change_rebuilds_every_page(self):
+        self.write("template.html", "<h1>{{ Title }}</h1>")
+        self.assertEqual(self.watcher.poll(), ["template.html"])
+        self.assertEqual(self.read("index.html"), "<h1>Home</h1>")
+        self.assertEqual(self.read(os.path.join("blog", "post.html")), "<h1>Post</h1>")
+
+    def test_rebuilds_follow_build_settings(self):
+        gencontent.set_minify(True)
+        self.write(os.path.join("content", "index.md"), "# Home\n\nsome   words")
+        self.watcher.poll()
+        self.assertEqual(self.read("index.html"), "Home<div><h1>Home</h1><p>some words</p></div>")
+
+    def test_removed_page_and_new_asset(self):
+        self.write(os.path.join("static", "site.css"), "body {}")
+        os.remove(os.path.join("content", "blog", "post.md"))
+        self.watcher.poll()
+        self.assertEqual(self.read("site.css"), "body {}")
+        self.assertFalse(os.path.exists(os.path.join("docs", "blog")))
+
+    def test_only_changed_sources_are_hashed(self):
+        hashed = []
+        hash_file = gencontent.hash_file
+
+        def counting_hash_file(path):
+            hashed.append(os.path.normpath(path))
+            return hash_file(path)
+
+        self.write(os.path.join("content", "blog", "post.md"), "# Edited post")
+        gencontent.hash_file = counting_hash_file
+        try:
+            self.watcher.poll()
+        finally:
+            gencontent.hash_file = hash_file
+        self.assertEqual(hashed, ["template.html", os.path.join("content", "blog", "post.md")])
+        # the manifest is only written when the session ends
+        self.assertFalse(os.path.exists(main.manifest_path))
+
+    def test_site_indexes_follow_page_metadata(self):
+        index = os.path.join("docs", "search-index.json")
+        os.utime(index, ns=(0, 0))
+        self.write(os.path.join("static", "site.css"), "body {}")
+        self.watcher.poll()
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        self.write(os.path.join("content", "index.md"), "# Welcome")
+        self.watcher.poll()
+        self.assertNotEqual(os.stat(index).st_mtime_ns, 0)
+
+    def test_failed_rebuild_is_retried(self):
+        def failing_rebuild(changed=None):
+            self.watcher.rebuild = self.rebuild
+            raise ValueError("broken")
+
+        self.watcher.rebuild = failing_rebuild
+        self.write(os.path.join("content", "blog", "post.md"), "# Edited post")
+        with redirect_stdout(StringIO()):
+            self.watcher.poll()
+        self.write(os.path.join("content", "index.md"), "# Welcome")
+        self.watcher.poll()
+        self.assertEqual(self.read(os.path.join("blog", "post.html")), "Edited post  <div><h1>Edited post</h1></div>")
+        self.assertEqual(self.read("index.html"), "Welcome  <div><h1>Welcome</h1></div>")
+
+
+class TestReloadScript(unittest.TestCase):
+    def test_inject_before_body(self):
+        html = inject_reload_script("<body><p>x</p></body>")
+        self.assertEqual(html, "<body><p>x</p>" + reload_script + "</body>")
+
+    def test_inject_without_body(self):
+        self.assertEqual(inject_reload_script("<p>x</p>"), "<p>x</p>" + reload_script)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import time
+
+from buildplan import scan_files # type: ignore
+
+
+def snapshot(dir_path):
+    # one scandir walk, then the stamp of each file
+    files = {}
+    for rel_path in scan_files(dir_path):
+        path = os.path.join(dir_path, rel_path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old, new):
+    changed = [path for path, stamp in new.items() if old.get(path) != stamp]
+    removed = [path for path in old if path not in new]
+    return sorted(changed), sorted(removed)
+
+
+class SiteWatcher:
+    # polls content/, static/ and the template and calls rebuild(sources)
+    # after any change; rebuild is the same incremental build the command line
+    # runs, told which sources changed so it need not check the others
+    def __init__(self, content_dir, static_dir, template_path, rebuild):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.rebuild = rebuild
+        # sources of a failed rebuild, passed again with the next change
+        self.pending = []
+        self.content = snapshot(content_dir)
+        self.static = snapshot(static_dir)
+        self.template = self.template_stamp()
+
+    def template_stamp(self):
+        stat = os.stat(self.template_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self):
+        # returns the sources that changed or were removed, empty when nothing did
+        content = snapshot(self.content_dir)
+        static = snapshot(self.static_dir)
+        template = self.template_stamp()
+        changed_pages, removed_pages = diff_snapshots(self.content, content)
+        changed_assets, removed_assets = diff_snapshots(self.static, static)
+        sources = changed_pages + removed_pages + changed_assets + removed_assets
+        if template != self.template:
+            sources.append(self.template_path)
+        self.content, self.static, self.template = content, static, template
+        if not sources:
+            return []
+        try:
+            self.rebuild(sorted(set(self.pending + sources)))
+            self.pending = []
+        except Exception as e:
+            # keep watching; the next save usually fixes it
+            print(f" ! rebuild failed: {e}")
+            self.pending = sorted(set(self.pending + sources))
+        return sources
+
+    def watch(self, on_change, interval=0.2):
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+            sources = self.poll()
+            if sources:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"Rebuilt after {len(sources)} change(s) in {elapsed:.1f} ms")
+                on_change(sources)